@@ -2,10 +2,12 @@
 """
 Main script to process a meeting audio file
 Usage: python process_meeting.py meeting.mp3 --title "Budget Q2" --attendees "Max,Anna,Julia"
+       python process_meeting.py "recordings/*.mp3" --batch
 """
 
 import sys
-import json
+import glob
+import asyncio
 import argparse
 from pathlib import Path
 from datetime import datetime
@@ -13,98 +15,90 @@ from datetime import datetime
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from transcription.whisper_transcriber import WhisperTranscriber
-from analysis.claude_analyzer import ClaudeAnalyzer
-from protocol.generator import ProtocolGenerator
-from integrations.odoo_connector import OdooConnector
+from utils import json_io
+
+# Schwere Module (openai, anthropic, jinja2, rapidfuzz) werden erst nach dem
+# Argument-Parsing importiert – --help und Fehler-Exits bleiben schnell.
 
 def load_config():
     """Load config.json"""
     config_path = Path(__file__).parent.parent / "config.json"
-    
+
     if not config_path.exists():
         print("⚠️  config.json nicht gefunden, nutze Beispiel-Config")
         config_path = Path(__file__).parent.parent / "config.json.example"
-    
-    with open(config_path, 'r') as f:
-        return json.load(f)
 
-def process_meeting(audio_path: str, args):
-    """Process a meeting audio file end-to-end"""
-    
-    print("="*60)
-    print("🎙️  OpenClaw Meeting Assistant")
-    print("="*60)
-    
-    # Load config
-    config = load_config()
-    
-    # Initialize components
+    return json_io.read_json(config_path)
+
+def init_components(config):
+    """Initialize transcriber, analyzer and generator"""
+    from transcription.whisper_transcriber import WhisperTranscriber
+    from analysis.claude_analyzer import ClaudeAnalyzer
+    from protocol.generator import ProtocolGenerator
+
     print("\n📦 Initialisiere Komponenten...")
     transcriber = WhisperTranscriber(config['transcription'])
     analyzer = ClaudeAnalyzer(config['analysis'])
     generator = ProtocolGenerator(config['protocol'])
-    
-    # Optional: Odoo
-    odoo = None
-    if config.get('odoo', {}).get('enabled', False):
-        try:
-            odoo = OdooConnector(config['odoo'])
-        except Exception as e:
-            print(f"⚠️  Odoo nicht verfügbar: {e}")
-    
-    # Step 1: Transcription
-    print("\n" + "="*60)
-    print("SCHRITT 1: TRANSKRIPTION")
-    print("="*60)
-    
-    transcript = transcriber.transcribe(audio_path)
-    
-    # Estimate cost
-    transcription_cost = transcriber.estimate_cost(transcript['duration'])
-    print(f"💰 Geschätzte Transkriptions-Kosten: ${transcription_cost:.2f}")
-    
-    # Save transcript
-    output_dir = Path(audio_path).parent / f"{Path(audio_path).stem}_output"
-    output_dir.mkdir(exist_ok=True)
-    
-    transcriber.save_transcript(transcript, str(output_dir / "transcript.json"))
-    
-    # Step 2: Analysis
-    print("\n" + "="*60)
-    print("SCHRITT 2: KI-ANALYSE")
-    print("="*60)
-    
-    # Prepare context
+
+    return transcriber, analyzer, generator
+
+def connect_odoo(config):
+    """Optional: connect to Odoo (auth + contact load), None if disabled/unavailable"""
+    if not config.get('odoo', {}).get('enabled', False):
+        return None
+    try:
+        from integrations.odoo_connector import OdooConnector
+        return OdooConnector(config['odoo'])
+    except Exception as e:
+        print(f"⚠️  Odoo nicht verfügbar: {e}")
+        return None
+
+def build_context(args, title=None):
+    """Build the analysis context from CLI arguments"""
     context = {
-        'title': args.title or 'Meeting',
+        'title': title or args.title or 'Meeting',
         'date': datetime.now().strftime('%d.%m.%Y')
     }
-    
+
     if args.attendees:
         context['attendees'] = [name.strip() for name in args.attendees.split(',')]
-    
-    analysis = analyzer.analyze(transcript['text'], context)
-    
-    # Estimate cost
-    analysis_cost = analyzer.estimate_cost(
-        len(transcript['text']), 
-        len(json.dumps(analysis))
-    )
-    print(f"💰 Geschätzte Analyse-Kosten: ${analysis_cost:.2f}")
-    
-    # Save analysis
-    analyzer.save_analysis(analysis, str(output_dir / "analysis.json"))
-    
+
+    return context
+
+def transcribe_meeting(transcriber, audio_path: str, save: bool = True):
+    """
+    Transcribe one audio file and save transcript.json (or .msgpack) next to it
+    save=False leaves the write to the caller (see process_meetings)
+    """
+    transcript = transcriber.transcribe(audio_path)
+
+    # Estimate cost (0 bei Cache-Treffer)
+    transcription_cost = 0.0 if transcript.get('cached') else transcriber.estimate_cost(transcript['duration'])
+    print(f"💰 Geschätzte Transkriptions-Kosten: ${transcription_cost:.2f}")
+
+    # Save transcript
+    output_dir = Path(audio_path).parent / f"{Path(audio_path).stem}_output"
+    output_dir.mkdir(exist_ok=True)
+
+    if save:
+        transcriber.save_transcript(transcript, str(output_dir / "transcript.json"))
+
+    return transcript, transcription_cost, output_dir
+
+def finish_meeting(generator, odoo, transcript, analysis, context, output_dir, costs):
+    """Speaker matching, protocol generation and summary for one analyzed meeting"""
+    transcription_cost, analysis_cost = costs
+
     # Step 3: Speaker Matching (Odoo)
     participants = []
     if odoo and context.get('attendees'):
         print("\n" + "="*60)
         print("SCHRITT 3: SPEAKER MATCHING (ODOO)")
         print("="*60)
-        
+
         matched = odoo.match_participants(context['attendees'])
-        
+
         for m in matched:
             participants.append({
                 'name': m['matched_name'] or m['original_name'],
@@ -113,12 +107,12 @@ def process_meeting(audio_path: str, args):
                 'present': True,
                 'confidence': m['confidence']
             })
-    
+
     # Step 4: Protocol Generation
     print("\n" + "="*60)
     print("SCHRITT 4: PROTOKOLL-ERSTELLUNG")
     print("="*60)
-    
+
     metadata = {
         **context,
         'participants': participants,
@@ -126,37 +120,39 @@ def process_meeting(audio_path: str, args):
         'start_time': '',
         'end_time': ''
     }
-    
+
     protocol = generator.generate(transcript, analysis, metadata)
-    
+
     # Save protocol
     protocol_path = output_dir / "protocol.md"
     generator.save_markdown(protocol, str(protocol_path))
-    
+
     # Summary
     print("\n" + "="*60)
     print("✅ FERTIG!")
     print("="*60)
-    
+
+    action_items = analysis.get('action_items') or ()
+    decisions = analysis.get('decisions') or ()
+    open_questions = analysis.get('open_questions') or ()
+    duration = transcript['duration']
+
     print(f"\n📊 Zusammenfassung:")
-    print(f"   Dauer: {transcript['duration']:.1f}s ({transcript['duration']/60:.1f} Min)")
+    print(f"   Dauer: {duration:.1f}s ({duration / 60:.1f} Min)")
     print(f"   Transkript: {len(transcript['text'])} Zeichen")
-    print(f"   Action Items: {len(analysis.get('action_items', []))}")
-    print(f"   Entscheidungen: {len(analysis.get('decisions', []))}")
-    print(f"   Offene Fragen: {len(analysis.get('open_questions', []))}")
-    
+    print(f"   Action Items: {len(action_items)}")
+    print(f"   Entscheidungen: {len(decisions)}")
+    print(f"   Offene Fragen: {len(open_questions)}")
+
     total_cost = transcription_cost + analysis_cost
     print(f"\n💰 Gesamtkosten: ${total_cost:.2f}")
-    
+
     print(f"\n📁 Output:")
-    print(f"   {output_dir / 'transcript.json'}")
+    for transcript_path in sorted(output_dir.glob('transcript.*')):
+        print(f"   {transcript_path}")
     print(f"   {output_dir / 'analysis.json'}")
     print(f"   {output_dir / 'protocol.md'}")
-    
-    print(f"\n📋 Nächster Schritt:")
-    print(f"   Review-Flow (wird mit Opus 4.6 implementiert)")
-    print(f"   Dann: Export nach Odoo/E-Mail/Memory")
-    
+
     return {
         'transcript': transcript,
         'analysis': analysis,
@@ -165,23 +161,182 @@ def process_meeting(audio_path: str, args):
         'cost': total_cost
     }
 
+def estimate_analysis_cost(analyzer, transcript, analysis, payload: bytes):
+    """
+    Estimate Claude cost for one analysis (incl. cache and batch pricing).
+    payload is the serialized analysis that also gets written to analysis.json.
+    """
+    return analyzer.estimate_cost(
+        len(transcript['text']),
+        len(payload),
+        cache_read_tokens=analysis.get('cache_read_input_tokens', 0),
+        cache_write_tokens=analysis.get('cache_creation_input_tokens', 0),
+        batch=analysis.get('batch', False)
+    )
+
+async def process_meeting(audio_path: str, args):
+    """
+    Process a meeting audio file end-to-end
+
+    The Odoo connection (XML-RPC auth + contact load) runs in a worker thread
+    while the audio is being transcribed, so it is off the critical path.
+    """
+
+    print("="*60)
+    print("🎙️  OpenClaw Meeting Assistant")
+    print("="*60)
+
+    # Load config
+    config = load_config()
+
+    # Initialize components
+    transcriber, analyzer, generator = init_components(config)
+
+    # Step 1: Transcription (parallel: Odoo-Verbindung)
+    print("\n" + "="*60)
+    print("SCHRITT 1: TRANSKRIPTION")
+    print("="*60)
+
+    (transcript, transcription_cost, output_dir), odoo = await asyncio.gather(
+        asyncio.to_thread(transcribe_meeting, transcriber, audio_path),
+        asyncio.to_thread(connect_odoo, config),
+    )
+
+    # Step 2: Analysis
+    print("\n" + "="*60)
+    print("SCHRITT 2: KI-ANALYSE")
+    print("="*60)
+
+    # Prepare context
+    context = build_context(args)
+
+    analysis = await analyzer.analyze_async(transcript['text'], context)
+
+    # Serialize once: used for the cost estimate and analysis.json
+    payload = json_io.dumps(analysis)
+
+    # Estimate cost
+    analysis_cost = estimate_analysis_cost(analyzer, transcript, analysis, payload)
+    print(f"💰 Geschätzte Analyse-Kosten: ${analysis_cost:.2f}")
+
+    # Save analysis
+    analyzer.save_analysis_bytes(payload, str(output_dir / "analysis.json"))
+
+    result = finish_meeting(
+        generator, odoo, transcript, analysis, context, output_dir,
+        (transcription_cost, analysis_cost)
+    )
+
+    print(f"\n📋 Nächster Schritt:")
+    print(f"   Review-Flow (wird mit Opus 4.6 implementiert)")
+    print(f"   Dann: Export nach Odoo/E-Mail/Memory")
+
+    return result
+
+async def process_meetings(audio_paths, args):
+    """
+    Process a backlog of meetings: transcribe each file, then analyze all
+    of them in a single Claude Message Batches job (50% cheaper, not interactive).
+    """
+
+    print("="*60)
+    print(f"🎙️  OpenClaw Meeting Assistant – Batch ({len(audio_paths)} Meetings)")
+    print("="*60)
+
+    config = load_config()
+    # Nicht interaktiv: günstigeres Transkriptionsmodell (falls konfiguriert)
+    transcription = config['transcription']
+    if transcription.get('batch_model'):
+        transcription['model'] = transcription['batch_model']
+    transcriber, analyzer, generator = init_components(config)
+
+    # Odoo verbindet sich im Hintergrund, während transkribiert wird
+    odoo_task = asyncio.create_task(asyncio.to_thread(connect_odoo, config))
+
+    # Step 1: Transcription (per file)
+    print("\n" + "="*60)
+    print("SCHRITT 1: TRANSKRIPTION")
+    print("="*60)
+
+    meetings = []
+    saves = []
+    for audio_path in audio_paths:
+        transcript, transcription_cost, output_dir = await asyncio.to_thread(
+            transcribe_meeting, transcriber, audio_path, False
+        )
+        # Schreiben läuft parallel zur Transkription der nächsten Datei
+        saves.append(asyncio.create_task(
+            transcriber.save_transcript_async(transcript, str(output_dir / "transcript.json"))
+        ))
+        # Ohne --title: Dateiname als Meeting-Titel
+        context = build_context(args, title=None if args.title else Path(audio_path).stem)
+        meetings.append((audio_path, transcript, transcription_cost, output_dir, context))
+
+    await asyncio.gather(*saves)
+    odoo = await odoo_task
+
+    # Step 2: Analysis (one batch job)
+    print("\n" + "="*60)
+    print("SCHRITT 2: KI-ANALYSE (BATCH)")
+    print("="*60)
+
+    analyses = analyzer.analyze_batch([(m[1]['text'], m[4]) for m in meetings])
+
+    results = []
+    for (audio_path, transcript, transcription_cost, output_dir, context), analysis in zip(meetings, analyses):
+        if 'error' in analysis:
+            print(f"\n❌ Analyse fehlgeschlagen für {audio_path}: {analysis['error']}")
+            continue
+
+        payload = json_io.dumps(analysis)
+        analysis_cost = estimate_analysis_cost(analyzer, transcript, analysis, payload)
+        analyzer.save_analysis_bytes(payload, str(output_dir / "analysis.json"))
+
+        print(f"\n📋 {audio_path}")
+        results.append(finish_meeting(
+            generator, odoo, transcript, analysis, context, output_dir,
+            (transcription_cost, analysis_cost)
+        ))
+
+    total_cost = sum(r['cost'] for r in results)
+    print(f"\n💰 Gesamtkosten Batch: ${total_cost:.2f} ({len(results)}/{len(audio_paths)} Meetings)")
+
+    return results
+
+def expand_audio_paths(patterns):
+    """Expand glob patterns (e.g. quoted "*.mp3") into a sorted list of files"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        paths.extend(matches if matches else [pattern])
+    return paths
+
 def main():
     parser = argparse.ArgumentParser(description='Process meeting audio file')
-    parser.add_argument('audio_path', help='Path to audio file (mp3, wav, m4a, etc.)')
+    parser.add_argument('audio_paths', nargs='+', metavar='audio_path',
+                        help='Path(s) or glob(s) to audio files (mp3, wav, m4a, etc.)')
     parser.add_argument('--title', help='Meeting title')
     parser.add_argument('--attendees', help='Comma-separated list of attendees')
     parser.add_argument('--type', help='Meeting type (team, customer, status)', default='team')
-    
+    parser.add_argument('--batch', action='store_true',
+                        help='Analyze via Claude Message Batches (cheaper, slower)')
+
     args = parser.parse_args()
-    
-    # Check if audio file exists
-    if not Path(args.audio_path).exists():
-        print(f"❌ Audio-Datei nicht gefunden: {args.audio_path}")
+    audio_paths = expand_audio_paths(args.audio_paths)
+
+    # Check if audio files exist
+    missing = [p for p in audio_paths if not Path(p).exists()]
+    if missing:
+        for p in missing:
+            print(f"❌ Audio-Datei nicht gefunden: {p}")
         sys.exit(1)
-    
+
     # Process
     try:
-        result = process_meeting(args.audio_path, args)
+        if args.batch or len(audio_paths) > 1:
+            asyncio.run(process_meetings(audio_paths, args))
+        else:
+            asyncio.run(process_meeting(audio_paths[0], args))
     except Exception as e:
         print(f"\n❌ Fehler: {e}")
         import traceback
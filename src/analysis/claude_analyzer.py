@@ -5,49 +5,18 @@ Extracts: Action Items, Decisions, Open Questions, Summary
 """
 
 import os
+import re
 import json
-from typing import Dict, List
-from anthropic import Anthropic
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from anthropic import Anthropic, AsyncAnthropic
 
-class ClaudeAnalyzer:
-    """Analyze meeting transcripts using Claude"""
-    
-    def __init__(self, config: Dict):
-        self.config = config
-        self.model = config.get('model', 'claude-sonnet-4-5')
-        self.max_tokens = config.get('max_tokens', 4000)
-        self.client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
-    
-    def analyze(self, transcript: str, context: Dict = None) -> Dict:
-        """
-        Analyze meeting transcript
-        
-        Args:
-            transcript: Full meeting transcription
-            context: Optional context (meeting title, attendees, agenda)
-        
-        Returns:
-            Dict with:
-                - summary: Executive summary
-                - action_items: List of action items
-                - decisions: List of decisions
-                - open_questions: List of open questions
-                - key_topics: Main topics discussed
-        """
-        print("🧠 Analysiere Meeting mit Claude...")
-        
-        # Build context string
-        context_str = ""
-        if context:
-            if context.get('title'):
-                context_str += f"Meeting-Titel: {context['title']}\n"
-            if context.get('attendees'):
-                context_str += f"Teilnehmer: {', '.join(context['attendees'])}\n"
-            if context.get('date'):
-                context_str += f"Datum: {context['date']}\n"
-        
-        # System prompt (QPS-specific)
-        system_prompt = """Du bist ein professioneller Meeting-Protokollant für QPS Engineering AG, 
+from utils import json_io
+
+# System prompt (QPS-specific)
+SYSTEM_PROMPT = """Du bist ein professioneller Meeting-Protokollant für QPS Engineering AG, 
 ein Schweizer Engineering-Unternehmen.
 
 Deine Aufgabe:
@@ -64,7 +33,7 @@ Wichtig:
 - Bei Action Items: Wenn kein Datum genannt, als "nicht definiert" markieren
 - Passiv vermeiden
 
-Ausgabe als JSON mit diesen Feldern:
+Gib das Ergebnis über das Tool emit_protocol zurück, mit dieser Struktur:
 {
   "summary": "...",
   "action_items": [
@@ -93,60 +62,483 @@ Ausgabe als JSON mit diesen Feldern:
   "key_topics": ["Budget Q2", "Neue Projekte", ...]
 }
 """
-        
-        # User prompt
-        user_prompt = f"""{context_str}
 
-Transkript:
-{transcript}
+# JSON schema for the emit_protocol tool (same shape as in SYSTEM_PROMPT)
+PROTOCOL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "action_items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "description": {"type": "string"},
+                    "assignee": {"type": "string"},
+                    "deadline": {"type": "string"},
+                    "context": {"type": "string"},
+                    "priority": {"type": "string", "enum": ["hoch", "mittel", "niedrig"]}
+                },
+                "required": ["description", "assignee", "deadline", "priority"]
+            }
+        },
+        "decisions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "description": {"type": "string"},
+                    "decided_by": {"type": "array", "items": {"type": "string"}},
+                    "context": {"type": "string"}
+                },
+                "required": ["description"]
+            }
+        },
+        "open_questions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "string"},
+                    "raised_by": {"type": ["string", "null"]},
+                    "assigned_to": {"type": ["string", "null"]}
+                },
+                "required": ["question"]
+            }
+        },
+        "key_topics": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["summary", "action_items", "decisions", "open_questions", "key_topics"]
+}
+
+PROTOCOL_TOOL = {
+    "name": "emit_protocol",
+    "description": "Gibt die strukturierte Meeting-Analyse zurück (Zusammenfassung, "
+                   "Action Items, Entscheidungen, offene Fragen, Hauptthemen).",
+    "input_schema": PROTOCOL_SCHEMA
+}
 
-Analysiere dieses Meeting und gib das Ergebnis als JSON zurück."""
-        
-        # Call Claude
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=self.max_tokens,
-            system=system_prompt,
-            messages=[
-                {"role": "user", "content": user_prompt}
-            ]
-        )
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+
+class ClaudeAnalyzer:
+    """Analyze meeting transcripts using Claude"""
+    
+    def __init__(self, config: Dict):
+        self.config = config
+        self.model = config.get('model', 'claude-sonnet-4-5')
+        self.max_tokens = config.get('max_tokens', 4000)
+        # Längere Transkripte werden in Teile dieser Grösse (Tokens) zerlegt
+        self.chunk_tokens = config.get('chunk_tokens', 10000)
+        self.max_concurrency = config.get('max_concurrency', 4)
+        client_kwargs = {
+            'api_key': os.getenv('ANTHROPIC_API_KEY'),
+            'default_headers': {"anthropic-beta": "prompt-caching-2024-07-31"},
+        }
+        self.client = Anthropic(**client_kwargs)
+        self.async_client = AsyncAnthropic(**client_kwargs)
+    
+    def analyze(self, transcript: str, context: Dict = None) -> Dict:
+        """
+        Analyze meeting transcript
         
-        # Extract JSON from response
-        response_text = response.content[0].text
-        
-        # Try to parse JSON (Claude should return valid JSON)
-        try:
-            result = json.loads(response_text)
-        except json.JSONDecodeError:
-            # Fallback: Extract JSON from markdown code block
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                json_str = response_text[json_start:json_end].strip()
-                result = json.loads(json_str)
-            else:
-                raise ValueError("Claude did not return valid JSON")
+        Args:
+            transcript: Full meeting transcription
+            context: Optional context (meeting title, attendees, agenda)
         
-        # Add metadata
-        result['model'] = self.model
-        result['tokens_used'] = response.usage.input_tokens + response.usage.output_tokens
+        Returns:
+            Dict with:
+                - summary: Executive summary
+                - action_items: List of action items
+                - decisions: List of decisions
+                - open_questions: List of open questions
+                - key_topics: Main topics discussed
+        
+        Transcripts longer than chunk_tokens are analyzed per part (parts
+        run in parallel) and merged by a final reduce call.
+        """
+        print("🧠 Analysiere Meeting mit Claude...")
+        
+        chunks = self._chunk_transcript(transcript)
+        
+        if len(chunks) == 1:
+            result = self._call(self._build_params(transcript, context))
+        else:
+            print(f"   Langes Transkript: {len(chunks)} Teile")
+            total = len(chunks)
+            # Erster Teil allein, damit die übrigen den Prompt-Cache treffen
+            partials = [self._call(self._build_params(chunks[0], context, (1, total)))]
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, total - 1)) as pool:
+                partials += pool.map(
+                    lambda part: self._call(self._build_params(part[1], context, (part[0], total))),
+                    enumerate(chunks[1:], start=2)
+                )
+            result = self._merge_usage(
+                self._call(self._build_reduce_params(partials, context)), partials
+            )
+        
+        self._report(result)
+        return result
+    
+    async def analyze_async(self, transcript: str, context: Dict = None) -> Dict:
+        """Like analyze(), but non-blocking; parts are sent with asyncio.gather"""
+        print("🧠 Analysiere Meeting mit Claude...")
+        
+        async def call(params: Dict) -> Dict:
+            return self._parse_response(await self.async_client.messages.create(**params))
         
+        chunks = self._chunk_transcript(transcript)
+        
+        if len(chunks) == 1:
+            result = await call(self._build_params(transcript, context))
+        else:
+            print(f"   Langes Transkript: {len(chunks)} Teile")
+            total = len(chunks)
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            
+            async def call_part(index: int, part: str) -> Dict:
+                async with semaphore:
+                    return await call(self._build_params(part, context, (index, total)))
+            
+            # Erster Teil allein, damit die übrigen den Prompt-Cache treffen
+            first = await call_part(1, chunks[0])
+            rest = await asyncio.gather(
+                *(call_part(i, part) for i, part in enumerate(chunks[1:], start=2))
+            )
+            partials = [first, *rest]
+            result = self._merge_usage(
+                await call(self._build_reduce_params(partials, context)), partials
+            )
+        
+        self._report(result)
+        return result
+    
+    def analyze_parts(self, parts: Iterable[str], context: Dict = None) -> Dict:
+        """
+        Analyze a transcript that arrives in parts (e.g. windows of Whisper
+        segments while the audio is still being decoded).
+        
+        Each part is sent as soon as it arrives, so Claude works on earlier
+        parts while later ones are still being transcribed; only the first
+        waits for the second, to know whether it is labeled as a part. More
+        than one part is merged by the reduce call, exactly like analyze().
+        Parts longer than chunk_tokens (a response without segments, one
+        very long segment) are split with _chunk_transcript first. No parts
+        at all (silent audio) are analyzed like analyze('').
+        If parts raises (e.g. the transcription failed), pending calls are
+        cancelled and the error propagates.
+        """
+        print("🧠 Analysiere Meeting mit Claude (laufend)...")
+        
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = []
+            first = None  # Teil 1 wartet, bis feststeht, ob ein zweiter folgt
+            try:
+                for index, part in enumerate(self._split_parts(parts), start=1):
+                    if index == 1:
+                        first = part
+                        continue
+                    if index == 2:
+                        futures.append(pool.submit(
+                            self._call, self._build_params(first, context, (1, None))
+                        ))
+                    print(f"   Teil {index} gesendet")
+                    futures.append(pool.submit(
+                        self._call_after, futures[0],
+                        self._build_params(part, context, (index, None))
+                    ))
+                
+                if not futures:
+                    # Einziger Teil (oder leeres Transkript) ohne Teil-Label
+                    futures.append(pool.submit(self._call, self._build_params(first or '', context)))
+                partials = [f.result() for f in futures]
+            except BaseException:
+                # Keine weiteren Teile auf ein abgebrochenes Transkript senden
+                for future in futures:
+                    future.cancel()
+                raise
+        
+        if len(partials) == 1:
+            result = partials[0]
+        else:
+            print(f"   Langes Transkript: {len(partials)} Teile")
+            result = self._merge_usage(
+                self._call(self._build_reduce_params(partials, context)), partials
+            )
+        
+        self._report(result)
+        return result
+    
+    def _split_parts(self, parts: Iterable[str]) -> Iterator[str]:
+        """Re-split oversized parts lazily, so streamed parts still go out early"""
+        for part in parts:
+            yield from self._chunk_transcript(part)
+    
+    def _call_after(self, first, params: Dict) -> Dict:
+        """Wait for the first part, so this one hits the prompt cache"""
+        first.result()
+        return self._call(params)
+    
+    def _call(self, params: Dict) -> Dict:
+        return self._parse_response(self.client.messages.create(**params))
+    
+    def _report(self, result: Dict):
         print(f"✅ Analyse fertig:")
         print(f"   Action Items: {len(result.get('action_items', []))}")
         print(f"   Entscheidungen: {len(result.get('decisions', []))}")
         print(f"   Offene Fragen: {len(result.get('open_questions', []))}")
         print(f"   Tokens: {result['tokens_used']}")
+        if result['cache_read_input_tokens']:
+            print(f"   Cache-Treffer: {result['cache_read_input_tokens']} Tokens")
+    
+    def analyze_batch(self, transcripts: List[Tuple[str, Dict]], poll_interval: int = 30) -> List[Dict]:
+        """
+        Analyze several meetings in one Message Batches job (50% discount)
+        
+        Transcripts longer than chunk_tokens go through the same map-reduce
+        as analyze(): their parts are sent with the other meetings, the
+        reduce calls follow as a second (smaller) batch.
+        
+        Args:
+            transcripts: List of (transcript_text, context) tuples
+            poll_interval: Seconds between status checks
+        
+        Returns:
+            List of analysis dicts in the same order as the input.
+            Failed requests yield a dict with an 'error' key.
+        """
+        print(f"🧠 Sende {len(transcripts)} Meetings als Batch an Claude...")
+        
+        chunked = [self._chunk_transcript(text) for text, _ in transcripts]
+        requests = []
+        for i, ((text, context), chunks) in enumerate(zip(transcripts, chunked)):
+            if len(chunks) == 1:
+                requests.append({"custom_id": str(i), "params": self._build_params(text, context)})
+                continue
+            requests += [
+                {
+                    "custom_id": f"{i}-{k}",
+                    "params": self._build_params(chunk, context, (k, len(chunks)))
+                }
+                for k, chunk in enumerate(chunks, start=1)
+            ]
+        parsed = self._run_batch(requests, poll_interval)
+        
+        results: List[Dict] = [{} for _ in transcripts]
+        partials_by_index = {}
+        reduce_requests = []
+        for i, ((_, context), chunks) in enumerate(zip(transcripts, chunked)):
+            if len(chunks) == 1:
+                results[i] = parsed[str(i)]
+                continue
+            partials = [parsed[f"{i}-{k}"] for k in range(1, len(chunks) + 1)]
+            failed_part = next((p for p in partials if 'error' in p), None)
+            if failed_part:
+                results[i] = failed_part
+                continue
+            partials_by_index[i] = partials
+            reduce_requests.append({
+                "custom_id": str(i),
+                "params": self._build_reduce_params(partials, context)
+            })
+        
+        if reduce_requests:
+            print(f"   Lange Transkripte: {len(reduce_requests)} Meetings werden zusammengeführt")
+            reduced = self._run_batch(reduce_requests, poll_interval)
+            for i, partials in partials_by_index.items():
+                result = reduced[str(i)]
+                results[i] = result if 'error' in result else self._merge_usage(result, partials)
+        
+        failed = sum(1 for r in results if 'error' in r)
+        print(f"✅ Batch-Analyse fertig: {len(transcripts) - failed} ok, {failed} fehlgeschlagen")
+        
+        return results
+    
+    def _run_batch(self, requests: List[Dict], poll_interval: int) -> Dict[str, Dict]:
+        """Submit one Message Batches job, wait for it, parsed results by custom_id"""
+        batch = self.client.messages.batches.create(requests=requests)
+        print(f"   Batch-ID: {batch.id}")
+        
+        while batch.processing_status != 'ended':
+            time.sleep(poll_interval)
+            batch = self.client.messages.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            print(f"   ⏳ {counts.succeeded + counts.errored}/{len(requests)} fertig")
+        
+        results = {r["custom_id"]: {'error': 'missing'} for r in requests}
+        for entry in self.client.messages.batches.results(batch.id):
+            if entry.result.type != 'succeeded':
+                results[entry.custom_id] = {'error': entry.result.type}
+                continue
+            try:
+                results[entry.custom_id] = self._parse_response(entry.result.message)
+                results[entry.custom_id]['batch'] = True
+            except ValueError as e:
+                results[entry.custom_id] = {'error': str(e)}
+        
+        return results
+    
+    @property
+    def chunk_chars(self) -> int:
+        """Part size in characters (1 char ≈ 0.25 tokens)"""
+        return int(self.chunk_tokens / 0.25)
+    
+    def _chunk_transcript(self, text: str, max_tokens: int = None) -> List[str]:
+        """
+        Split a transcript into parts of at most max_tokens (1 char ≈ 0.25 tokens).
+        Splits on line breaks, then sentence ends; only oversized sentences
+        are cut hard.
+        """
+        max_chars = int(max_tokens / 0.25) if max_tokens else self.chunk_chars
+        if len(text) <= max_chars:
+            return [text]
+        
+        # (separator, text) units, kleinste Einheit = Satz
+        units = []
+        for line in text.split('\n'):
+            sep = '\n'
+            for sentence in ([line] if len(line) <= max_chars else _SENTENCE_END_RE.split(line)):
+                for start in range(0, max(len(sentence), 1), max_chars):
+                    units.append((sep, sentence[start:start + max_chars]))
+                    sep = ' '
+        
+        chunks, current, size = [], '', 0
+        for sep, unit in units:
+            if current and size + len(sep) + len(unit) > max_chars:
+                chunks.append(current)
+                current, size = '', 0
+            current = current + sep + unit if current else unit
+            size = len(current)
+        if current:
+            chunks.append(current)
         
+        return chunks
+    
+    def _build_params(self, transcript: str, context: Dict = None,
+                      part: Optional[Tuple[int, int]] = None) -> Dict:
+        """
+        Build messages.create parameters (shared by analyze and analyze_batch)
+        
+        part: (index, total) when analyzing one part of a chunked transcript;
+              total is None while the transcript is still streaming in
+        """
+        label = "Transkript"
+        if part:
+            label += f" (Teil {part[0]}/{part[1]})" if part[1] else f" (Teil {part[0]})"
+        transcript_prompt = f"""{label}:
+{transcript}"""
+        
+        return self._request(self._instruction_prompt(context), transcript_prompt)
+    
+    def _instruction_prompt(self, context: Dict = None) -> str:
+        """
+        Stable user-prompt prefix (context + instruction). Identical for all
+        parts and the reduce call of one meeting, so it is cached.
+        """
+        # Build context string
+        context_str = ""
+        if context:
+            if context.get('title'):
+                context_str += f"Meeting-Titel: {context['title']}\n"
+            if context.get('attendees'):
+                context_str += f"Teilnehmer: {', '.join(context['attendees'])}\n"
+            if context.get('date'):
+                context_str += f"Datum: {context['date']}\n"
+        
+        return f"""{context_str}
+Analysiere das folgende Meeting-Transkript und gib das Ergebnis über emit_protocol zurück."""
+    
+    def _build_reduce_params(self, partials: List[Dict], context: Dict = None) -> Dict:
+        """Build the reduce call that merges per-part analyses into one"""
+        fields = PROTOCOL_SCHEMA['properties'].keys()
+        parts_json = json_io.dumps(
+            [{k: p.get(k) for k in fields} for p in partials], indent=False
+        ).decode('utf-8')
+        
+        reduce_prompt = f"""Das Meeting wurde in {len(partials)} Teilen analysiert.
+Führe die folgenden Teilanalysen zu einer Gesamtanalyse zusammen:
+- Zusammenfassung über das ganze Meeting (2-3 Absätze)
+- Doppelte Action Items, Entscheidungen und offene Fragen zusammenführen
+- Offene Fragen entfernen, die in einem späteren Teil beantwortet wurden
+- 3-5 Hauptthemen für das ganze Meeting
+
+Teilanalysen:
+{parts_json}"""
+        
+        return self._request(self._instruction_prompt(context), reduce_prompt)
+    
+    @staticmethod
+    def _merge_usage(result: Dict, partials: List[Dict]) -> Dict:
+        """Add token usage of the per-part calls to the reduce result"""
+        for key in ('tokens_used', 'cache_read_input_tokens', 'cache_creation_input_tokens'):
+            result[key] += sum(p[key] for p in partials)
+        result['chunks'] = len(partials)
         return result
     
-    def estimate_cost(self, input_chars: int, output_chars: int) -> float:
+    def _request(self, instruction_prompt: str, content_prompt: str) -> Dict:
+        """
+        messages.create parameters: cached prefix (system prompt, tool,
+        instruction block) followed by the uncached content block
+        """
+        return {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "system": [
+                {
+                    "type": "text",
+                    "text": SYSTEM_PROMPT,
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ],
+            "tools": [PROTOCOL_TOOL],
+            "tool_choice": {"type": "tool", "name": "emit_protocol"},
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": instruction_prompt,
+                            "cache_control": {"type": "ephemeral"}
+                        },
+                        {"type": "text", "text": content_prompt}
+                    ]
+                }
+            ]
+        }
+    
+    def _parse_response(self, response) -> Dict:
+        """Extract the analysis (emit_protocol tool input) and usage metadata from a Claude message"""
+        tool_input = next(
+            (b.input for b in response.content if b.type == 'tool_use'), None
+        )
+        if tool_input is None:
+            raise ValueError("Claude did not call emit_protocol")
+        
+        result = dict(tool_input)
+        
+        # Add metadata
+        result['model'] = self.model
+        result['tokens_used'] = response.usage.input_tokens + response.usage.output_tokens
+        result['cache_read_input_tokens'] = getattr(response.usage, 'cache_read_input_tokens', 0) or 0
+        result['cache_creation_input_tokens'] = getattr(response.usage, 'cache_creation_input_tokens', 0) or 0
+        
+        return result
+    
+    def estimate_cost(self,
+                      input_chars: int,
+                      output_chars: int,
+                      cache_read_tokens: int = 0,
+                      cache_write_tokens: int = 0,
+                      batch: bool = False) -> float:
         """
         Estimate analysis cost
         
         Claude Sonnet 4.5:
         - Input: $3/M tokens (~750k chars)
         - Output: $15/M tokens
+        - Cache read: 0.1× input price
+        - Cache write: 1.25× input price
+        - Message Batches: 50% discount on everything
         
         Rough estimate: 1 char ≈ 0.25 tokens
         """
@@ -155,13 +547,21 @@ Analysiere dieses Meeting und gib das Ergebnis als JSON zurück."""
         
         input_cost = (input_tokens / 1_000_000) * 3
         output_cost = (output_tokens / 1_000_000) * 15
+        cache_cost = (
+            (cache_read_tokens / 1_000_000) * 3 * 0.1
+            + (cache_write_tokens / 1_000_000) * 3 * 1.25
+        )
         
-        return input_cost + output_cost
+        total = input_cost + output_cost + cache_cost
+        return total * 0.5 if batch else total
     
     def save_analysis(self, analysis: Dict, output_path: str):
         """Save analysis to JSON file"""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(analysis, f, indent=2, ensure_ascii=False)
+        self.save_analysis_bytes(json_io.dumps(analysis), output_path)
+    
+    def save_analysis_bytes(self, payload: bytes, output_path: str):
+        """Save an already serialized analysis (see utils.json_io.dumps)"""
+        json_io.write_bytes(payload, output_path)
         print(f"💾 Analyse gespeichert: {output_path}")
 
 
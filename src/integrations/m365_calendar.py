@@ -5,11 +5,37 @@ Pulls meeting metadata from Outlook Calendar to auto-fill context.
 Reuses existing OpenClaw m365-calendar credentials.
 """
 
+import asyncio
 import json
+import re
 import subprocess
+import threading
+import time
+from contextlib import closing
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Optional, List
+from typing import Dict, Iterator, Optional, List, Tuple
+
+try:
+    import ijson  # optional: stream-parse events instead of loading the whole array
+except ImportError:
+    ijson = None
+
+# Timeout für den list-events.mjs Aufruf (Sekunden)
+CALENDAR_TIMEOUT = 30
+
+# Wie lange abgerufene Events wiederverwendet werden (Sekunden)
+EVENTS_CACHE_TTL = 30
+
+_JSON_ERRORS = (json.JSONDecodeError,) + ((ijson.JSONError,) if ijson else ())
+
+# Agenda-Zeile: "1."–"5." oder Bullet, danach mind. 4 Zeichen Text. Führende
+# Nummerierungs-/Bullet-Zeichen werden wie bei str.lstrip komplett übersprungen.
+_AGENDA_RE = re.compile(
+    r'^[^\S\n]*(?:[1-5]\.|[-•*–])[0-9.\-•*– \t]*([^0-9.\-•*– \t\n].{2,}?\S)[^\S\n]*$',
+    re.MULTILINE,
+)
+_HTML_BREAK_RE = re.compile(r'<br>|<p>')
 
 
 class M365CalendarContext:
@@ -18,6 +44,8 @@ class M365CalendarContext:
     def __init__(self, config: Dict):
         self.profile = config.get('profile', 'work')
         self.script_dir = Path('~/.openclaw/workspace/skills/m365-calendar/scripts').expanduser()
+        # (profile, days, top) → (monotonic timestamp, events)
+        self._events_cache: Dict[Tuple[str, int, int], Tuple[float, List[Dict]]] = {}
 
     def find_meeting_by_time(self, meeting_time: datetime, tolerance_minutes: int = 30) -> Optional[Dict]:
         """
@@ -31,35 +59,17 @@ class M365CalendarContext:
             Meeting-Dict oder None
         """
         try:
-            result = subprocess.run(
-                [
-                    'node', str(self.script_dir / 'list-events.mjs'),
-                    '--profile', self.profile,
-                    '--days', '1',
-                    '--top', '20',
-                    '--json',
-                ],
-                capture_output=True, text=True, timeout=30,
-            )
-
-            if result.returncode != 0:
-                print(f"⚠️  Kalender-Abfrage fehlgeschlagen: {result.stderr[:200]}")
-                return None
-
-            events = json.loads(result.stdout)
-
-            for event in events:
-                event_start = datetime.fromisoformat(
-                    event.get('start', {}).get('dateTime', '').replace('Z', '+00:00')
-                )
-                diff = abs((event_start - meeting_time).total_seconds()) / 60
-
-                if diff <= tolerance_minutes:
-                    return self._parse_event(event)
+            with closing(self._events()) as events:
+                for event in events:
+                    # Erster Treffer reicht – der Rest wird beim Schliessen noch gecacht
+                    if self._is_within(event, meeting_time, tolerance_minutes):
+                        return self._parse_event(event)
 
         except FileNotFoundError:
             print("⚠️  m365-calendar Skill nicht gefunden")
-        except json.JSONDecodeError:
+        except subprocess.CalledProcessError as e:
+            print(f"⚠️  Kalender-Abfrage fehlgeschlagen: {(e.stderr or '')[:200]}")
+        except _JSON_ERRORS:
             print("⚠️  Kalender-Antwort kein gültiges JSON")
         except subprocess.TimeoutExpired:
             print("⚠️  Kalender-Abfrage Timeout")
@@ -71,27 +81,162 @@ class M365CalendarContext:
     def get_todays_meetings(self) -> List[Dict]:
         """Alle heutigen Meetings abrufen"""
         try:
-            result = subprocess.run(
-                [
-                    'node', str(self.script_dir / 'list-events.mjs'),
-                    '--profile', self.profile,
-                    '--days', '1',
-                    '--top', '20',
-                    '--json',
-                ],
-                capture_output=True, text=True, timeout=30,
-            )
+            with closing(self._events()) as events:
+                return [self._parse_event(e) for e in events]
 
-            if result.returncode != 0:
-                return []
+        except subprocess.CalledProcessError:
+            return []
+        except Exception as e:
+            print(f"⚠️  Kalender-Fehler: {e}")
+            return []
+
+    async def find_meeting_by_time_async(self, meeting_time: datetime,
+                                         tolerance_minutes: int = 30) -> Optional[Dict]:
+        """Wie find_meeting_by_time, blockiert aber den Event-Loop nicht"""
+        try:
+            for event in await self._fetch_events_async():
+                if self._is_within(event, meeting_time, tolerance_minutes):
+                    return self._parse_event(event)
+        except asyncio.TimeoutError:
+            print("⚠️  Kalender-Abfrage Timeout")
+        except Exception as e:
+            print(f"⚠️  Kalender-Fehler: {e}")
 
-            events = json.loads(result.stdout)
-            return [self._parse_event(e) for e in events]
+        return None
 
+    async def get_todays_meetings_async(self) -> List[Dict]:
+        """Wie get_todays_meetings, blockiert aber den Event-Loop nicht"""
+        try:
+            return [self._parse_event(e) for e in await self._fetch_events_async()]
         except Exception as e:
             print(f"⚠️  Kalender-Fehler: {e}")
             return []
 
+    @staticmethod
+    def _is_within(event: Dict, meeting_time: datetime, tolerance_minutes: int) -> bool:
+        event_start = datetime.fromisoformat(
+            event.get('start', {}).get('dateTime', '').replace('Z', '+00:00')
+        )
+        diff = abs((event_start - meeting_time).total_seconds()) / 60
+        return diff <= tolerance_minutes
+
+    def _cached_events(self, days: int, top: int) -> Optional[List[Dict]]:
+        """Events aus dem TTL-Cache oder None wenn abgelaufen/nicht vorhanden"""
+        cached = self._events_cache.get((self.profile, days, top))
+        if cached and time.monotonic() - cached[0] < EVENTS_CACHE_TTL:
+            return cached[1]
+        return None
+
+    def _store_events(self, days: int, top: int, events: List[Dict]):
+        self._events_cache[(self.profile, days, top)] = (time.monotonic(), events)
+
+    def _events(self, days: int = 1, top: int = 20) -> Iterator[Dict]:
+        """
+        Events aus dem Cache, sonst live gestreamt. Bricht der Aufrufer früh
+        ab (find_meeting_by_time), wird der Rest beim Schliessen noch gelesen
+        und die ganze Liste gecacht – ein folgendes get_* im selben Fenster
+        startet so keinen zweiten Prozess.
+        """
+        cached = self._cached_events(days, top)
+        if cached is not None:
+            yield from cached
+            return
+
+        seen = []
+        with closing(self._iter_events(days, top)) as events:
+            try:
+                for event in events:
+                    seen.append(event)
+                    yield event
+            except GeneratorExit:
+                try:
+                    seen.extend(events)
+                except Exception:
+                    pass  # Rest nicht lesbar → nicht cachen, der Treffer bleibt gültig
+                else:
+                    self._store_events(days, top, seen)
+                raise
+        self._store_events(days, top, seen)
+
+    def _list_events_cmd(self, days: int, top: int) -> List[str]:
+        return [
+            'node', str(self.script_dir / 'list-events.mjs'),
+            '--profile', self.profile,
+            '--days', str(days),
+            '--top', str(top),
+            '--json',
+        ]
+
+    async def _fetch_events_async(self, days: int = 1, top: int = 20) -> List[Dict]:
+        """Events via asyncio-Subprozess abrufen (teilt den TTL-Cache)"""
+        cached = self._cached_events(days, top)
+        if cached is not None:
+            return cached
+
+        proc = await asyncio.create_subprocess_exec(
+            *self._list_events_cmd(days, top),
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), CALENDAR_TIMEOUT)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+
+        if proc.returncode != 0:
+            raise RuntimeError(
+                f"Kalender-Abfrage fehlgeschlagen: {stderr.decode('utf-8', errors='replace')[:200]}"
+            )
+
+        events = json.loads(stdout)
+        self._store_events(days, top, events)
+        return events
+
+    def _iter_events(self, days: int = 1, top: int = 20) -> Iterator[Dict]:
+        """
+        Stream events from list-events.mjs as they are parsed.
+
+        Raises CalledProcessError (non-zero exit) and TimeoutExpired like
+        subprocess.run would – also after valid JSON, so a partial or empty
+        array from a failing CLI (e.g. expired auth) is not taken as the
+        result; the Node process is terminated as soon as the caller stops
+        iterating.
+        """
+        cmd = self._list_events_cmd(days, top)
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        timer = threading.Timer(CALENDAR_TIMEOUT, proc.kill)
+        timer.start()
+
+        try:
+            try:
+                if ijson is not None:
+                    yield from ijson.items(proc.stdout, 'item', use_float=True)
+                else:
+                    yield from json.load(proc.stdout)
+            except _JSON_ERRORS:
+                # Ungültiges JSON ist meist Folge eines Fehlers/Timeouts im Node-Prozess
+                self._check_exit(proc, cmd, timer)
+                raise
+            self._check_exit(proc, cmd, timer)
+        finally:
+            timer.cancel()
+            if proc.poll() is None:
+                proc.terminate()
+            proc.wait()
+            proc.stdout.close()
+            proc.stderr.close()
+
+    @staticmethod
+    def _check_exit(proc: subprocess.Popen, cmd: List[str], timer: threading.Timer):
+        """Wait for the process; TimeoutExpired/CalledProcessError if it failed"""
+        returncode = proc.wait()
+        if not timer.is_alive():
+            raise subprocess.TimeoutExpired(cmd, CALENDAR_TIMEOUT)
+        if returncode != 0:
+            stderr = proc.stderr.read().decode('utf-8', errors='replace')
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
+
     def _parse_event(self, event: Dict) -> Dict:
         """Calendar-Event in Meeting-Metadata konvertieren"""
         start = event.get('start', {}).get('dateTime', '')
@@ -129,15 +274,6 @@ class M365CalendarContext:
         if not body:
             return []
 
-        agenda = []
-        lines = body.replace('<br>', '\n').replace('<p>', '\n').replace('</p>', '')
-
-        for line in lines.split('\n'):
-            line = line.strip()
-            # Erkenne nummerierte Listen, Bullet Points, Agenda-Formate
-            if any(line.startswith(p) for p in ('1.', '2.', '3.', '4.', '5.', '-', '•', '*', '–')):
-                clean = line.lstrip('0123456789.-•*– \t')
-                if clean and len(clean) > 3:
-                    agenda.append(clean)
-
-        return agenda
+        # Ein Regex-Durchlauf statt Python-Schleife über alle Zeilen
+        cleaned = _HTML_BREAK_RE.sub('\n', body.replace('</p>', ''))
+        return _AGENDA_RE.findall(cleaned)
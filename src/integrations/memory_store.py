@@ -5,11 +5,32 @@ Saves meeting protocols as searchable memory files.
 Enables cross-meeting queries via memory_search.
 """
 
+import asyncio
 import json
 import re
+import sqlite3
+from contextlib import closing
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class _SlugTable(dict):
+    """
+    str.translate-Tabelle für _slugify: behält a-z, 0-9, äöüß, '-' und
+    Whitespace, löscht alles andere. Wird pro Codepoint einmal berechnet.
+    """
+    ALLOWED = set('abcdefghijklmnopqrstuvwxyz0123456789äöüß-')
+
+    def __missing__(self, codepoint: int):
+        char = chr(codepoint)
+        value = codepoint if (char in self.ALLOWED or char.isspace()) else None
+        self[codepoint] = value
+        return value
+
+
+_SLUG_TABLE = _SlugTable()
+_WHITESPACE_RE = re.compile(r'\s+')
 
 
 class MemoryStore:
@@ -21,6 +42,10 @@ class MemoryStore:
         ).expanduser()
         self.storage_path.mkdir(parents=True, exist_ok=True)
 
+        # Volltext-Index (SQLite FTS5); die .md-Dateien bleiben die Quelle
+        self.index_path = self.storage_path / 'index.sqlite'
+        self.index_enabled = config.get('index_enabled', True) and self._init_index()
+
     def save_meeting(self, protocol_md: str, analysis: Dict, metadata: Dict) -> Path:
         """
         Speichere Meeting als Markdown-Datei im Memory-Verzeichnis
@@ -47,9 +72,51 @@ class MemoryStore:
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(memory_content)
 
+        if self.index_enabled:
+            with closing(self._connect()) as conn, conn:
+                self._index_file(conn, filepath, memory_content)
+
         print(f"💾 Meeting in Memory gespeichert: {filepath}")
         return filepath
 
+    # ── Volltext-Index ───────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        """Neue Verbindung; mit closing(...) schließen, `with conn` committet nur"""
+        return sqlite3.connect(self.index_path)
+
+    def _init_index(self) -> bool:
+        """
+        Erstelle FTS5-Tabelle, indexiere noch nicht erfasste Dateien und
+        entferne Einträge gelöschter Dateien
+        """
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS meetings "
+                    "USING fts5(path UNINDEXED, content, tokenize='unicode61')"
+                )
+                indexed = {row[0] for row in conn.execute("SELECT path FROM meetings")}
+                files = {str(p): p for p in self.storage_path.glob("*.md")}
+                self._drop_paths(conn, indexed - files.keys())
+                for path, filepath in files.items():
+                    if path not in indexed:
+                        self._index_file(conn, filepath, filepath.read_text(encoding='utf-8'))
+            return True
+        except sqlite3.OperationalError as e:
+            # SQLite ohne FTS5 → lineare Suche über die Dateien
+            print(f"⚠️  Memory-Index nicht verfügbar: {e}")
+            return False
+
+    @staticmethod
+    def _drop_paths(conn: sqlite3.Connection, paths: Iterable[str]):
+        conn.executemany("DELETE FROM meetings WHERE path = ?", ((p,) for p in paths))
+
+    @staticmethod
+    def _index_file(conn: sqlite3.Connection, filepath: Path, content: str):
+        conn.execute("DELETE FROM meetings WHERE path = ?", (str(filepath),))
+        conn.execute("INSERT INTO meetings (path, content) VALUES (?, ?)", (str(filepath), content))
+
     def _build_memory_content(self, protocol_md: str, analysis: Dict, metadata: Dict) -> str:
         """Erstelle Memory-Datei mit Metadaten für bessere Suche"""
         lines = [
@@ -113,32 +180,107 @@ class MemoryStore:
         files = sorted(self.storage_path.glob("*.md"), reverse=True)
         return files[:limit]
 
-    def search_meetings(self, query: str) -> list:
-        """Einfache Textsuche über alle Meeting-Dateien"""
+    def search_meetings(self, query: str, limit: int = 20) -> List[Dict]:
+        """
+        Volltextsuche über alle Meetings (FTS5, Präfix-Match auf das letzte Wort)
+
+        Returns:
+            Liste von {'file', 'name', 'snippet', 'matches'} (mit und ohne
+            Index gleich), beste Treffer zuerst; matches = bis zu 5
+            {'line', 'text'} mit der Anfrage als Teilstring
+        """
+        if not self.index_enabled:
+            return self._search_files(query, limit)
+
+        # Anfrage als Phrase quoten, damit Sonderzeichen (z.B. "Q2-Budget")
+        # nicht als FTS5-Syntax interpretiert werden
+        terms = query.strip().replace('"', '""')
+        if not terms:
+            return []
+        match = f'"{terms}"*'
+
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                "SELECT path, snippet(meetings, 1, '[', ']', '…', 10), content "
+                "FROM meetings WHERE content MATCH ? ORDER BY rank LIMIT ?",
+                (match, limit),
+            ).fetchall()
+            # Außerhalb gelöschte Dateien nicht mehr liefern (und austragen)
+            missing = [path for path, _, _ in rows if not Path(path).exists()]
+            self._drop_paths(conn, missing)
+
+        query_lower = query.lower()
+        return [
+            self._result(Path(path), content, query_lower, snippet)
+            for path, snippet, content in rows
+            if path not in missing
+        ]
+
+    async def search_meetings_async(self, query: str, limit: int = 20) -> List[Dict]:
+        """
+        Wie search_meetings, blockiert aber den Event-Loop nicht.
+        Ohne Index werden die Dateien parallel in Worker-Threads gelesen.
+        """
+        if self.index_enabled:
+            return await asyncio.to_thread(self.search_meetings, query, limit)
+
+        paths = list(self.storage_path.glob("*.md"))
+        contents = await asyncio.gather(
+            *(asyncio.to_thread(p.read_text, encoding='utf-8') for p in paths)
+        )
+        return self._match_contents(query, zip(paths, contents), limit)
+
+    async def save_meeting_async(self, protocol_md: str, analysis: Dict, metadata: Dict) -> Path:
+        """Wie save_meeting, blockiert aber den Event-Loop nicht"""
+        return await asyncio.to_thread(self.save_meeting, protocol_md, analysis, metadata)
+
+    def _search_files(self, query: str, limit: int = 20) -> List[Dict]:
+        """Einfache Textsuche über alle Meeting-Dateien (Fallback ohne Index)"""
+        return self._match_contents(
+            query,
+            ((p, p.read_text(encoding='utf-8')) for p in self.storage_path.glob("*.md")),
+            limit
+        )
+
+    @classmethod
+    def _match_contents(cls, query: str, files: Iterable[Tuple[Path, str]],
+                        limit: int = 20) -> List[Dict]:
         results = []
         query_lower = query.lower()
 
-        for filepath in self.storage_path.glob("*.md"):
-            content = filepath.read_text(encoding='utf-8')
+        for filepath, content in files:
             if query_lower in content.lower():
-                # Finde relevante Zeilen
-                matches = []
-                for i, line in enumerate(content.split('\n')):
-                    if query_lower in line.lower():
-                        matches.append({'line': i + 1, 'text': line.strip()})
-
-                results.append({
-                    'file': str(filepath),
-                    'name': filepath.stem,
-                    'matches': matches[:5],
-                })
+                results.append(cls._result(filepath, content, query_lower))
+                if len(results) >= limit:
+                    break
 
         return results
 
+    @staticmethod
+    def _result(filepath: Path, content: str, query_lower: str,
+                snippet: Optional[str] = None) -> Dict:
+        """Ein Suchtreffer – gleiche Form für FTS und lineare Suche"""
+        # Finde relevante Zeilen
+        matches = []
+        for i, line in enumerate(content.split('\n')):
+            if query_lower in line.lower():
+                matches.append({'line': i + 1, 'text': line.strip()})
+                if len(matches) == 5:
+                    break
+
+        if snippet is None:
+            snippet = matches[0]['text'] if matches else ''
+
+        return {
+            'file': str(filepath),
+            'name': filepath.stem,
+            'snippet': snippet,
+            'matches': matches,
+        }
+
     @staticmethod
     def _slugify(text: str) -> str:
-        text = text.lower()
-        text = re.sub(r'[^a-z0-9äöüß\s-]', '', text)
-        text = re.sub(r'[\s]+', '-', text)
+        text = text.lower().translate(_SLUG_TABLE)
+        text = _WHITESPACE_RE.sub('-', text)
         text = text.strip('-')
         return text[:60]
@@ -7,20 +7,29 @@ Odoo integration
 
 import os
 import json
+import threading
 import xmlrpc.client
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
-from fuzzywuzzy import process
+from rapidfuzz import process, fuzz, utils
+
+from utils import json_io
+
 
 class OdooConnector:
     """Connect to Odoo and manage tasks"""
     
+    # Max. Anzahl gemerkter Speaker-Matches pro Instanz
+    MATCH_CACHE_SIZE = 4096
+    
     def __init__(self, config: Dict):
         self.config = config
         
         # Load Odoo config from existing openclaw setup
         config_path = os.path.expanduser(config.get('config_path'))
-        contacts_path = os.path.expanduser(config.get('contacts_path'))
+        # Optional: lokale Kopie der Kontakte (Offline-Fallback, write-through)
+        contacts_path = config.get('contacts_path')
+        self.contacts_path = os.path.expanduser(contacts_path) if contacts_path else None
         
         with open(config_path, 'r') as f:
             odoo_config = json.load(f)
@@ -30,18 +39,117 @@ class OdooConnector:
         self.username = odoo_config['username']
         self.api_key = odoo_config['api_key']
         
-        # Load contacts for fuzzy matching
-        with open(contacts_path, 'r') as f:
-            self.contacts = json.load(f)
-        
         # Connect to Odoo
-        self.common = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common')
-        self.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object')
-        self.uid = self.common.authenticate(self.db, self.username, self.api_key, {})
+        # Ein gemeinsamer Transport für beide Endpoints: xmlrpc.client hält die
+        # HTTP/1.1-Verbindung offen, so gibt es nur einen TCP/TLS-Handshake.
+        # Nicht thread-safe – weitere Threads bekommen eigene Proxies (siehe models).
+        self._transport_cls = (xmlrpc.client.SafeTransport if self.url.startswith('https')
+                               else xmlrpc.client.Transport)
+        self._transport = self._transport_cls()
+        self._local = threading.local()
+        # Match-Memo wird aus dem Task-Thread-Pool gelesen und geschrieben
+        self._match_lock = threading.Lock()
+        self.common = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common', transport=self._transport)
+        self._local.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object', transport=self._transport)
+        try:
+            self.uid = self.common.authenticate(self.db, self.username, self.api_key, {})
+        except (OSError, xmlrpc.client.ProtocolError) as e:
+            # Server nicht erreichbar: nur mit lokaler Kontaktkopie weitermachen
+            self._load_cached_contacts(e)
+            self.uid = None
+            print(f"⚠️  Odoo offline: {self.url} (Task-Erstellung nicht möglich)")
+            print(f"   Kontakte geladen: {len(self.contacts)}")
+            return
+        if not self.uid:
+            raise ValueError(f"Odoo-Anmeldung fehlgeschlagen für '{self.username}' ({self.url}, DB {self.db})")
+        
+        # Load contacts for fuzzy matching
+        self.refresh_contacts()
         
         print(f"✅ Odoo verbunden: {self.url}")
         print(f"   Kontakte geladen: {len(self.contacts)}")
     
+    @property
+    def models(self) -> xmlrpc.client.ServerProxy:
+        """object endpoint proxy, one per thread (each with its own connection)"""
+        try:
+            return self._local.models
+        except AttributeError:
+            self._local.models = xmlrpc.client.ServerProxy(
+                f'{self.url}/xmlrpc/2/object', transport=self._transport_cls()
+            )
+            return self._local.models
+    
+    def refresh_contacts(self):
+        """
+        Load all active partners with one res.partner search_read call.
+        Falls back to contacts_path only if Odoo is unreachable (server
+        errors are raised); on success the local copy is updated.
+        """
+        if self.uid is None:
+            # offline gestartet → erneut versuchen wäre ohne uid sinnlos
+            self._load_cached_contacts(None)
+            return
+        try:
+            partners = self.models.execute_kw(
+                self.db, self.uid, self.api_key,
+                'res.partner', 'search_read',
+                [[['active', '=', True]]],
+                {'fields': ['name', 'email', 'id'], 'limit': 10000}
+            )
+            self.contacts = {
+                p['name']: {
+                    'name': p['name'],
+                    'email': p['email'] or None,
+                    'odoo_id': p['id'],
+                }
+                for p in partners if p.get('name')
+            }
+        except (OSError, xmlrpc.client.ProtocolError) as e:
+            self._load_cached_contacts(e)
+            return
+        
+        if self.contacts_path:
+            # Erst temporär schreiben: der Offline-Fallback liest nie eine halbe Datei
+            tmp_path = self.contacts_path + '.tmp'
+            try:
+                json_io.write_json(self.contacts, tmp_path)
+                os.replace(tmp_path, self.contacts_path)
+            except OSError as e:
+                print(f"⚠️  Kontakt-Cache nicht geschrieben: {e}")
+        
+        self._index_contacts()
+    
+    def _load_cached_contacts(self, error: Optional[Exception]):
+        """Contacts from contacts_path after a connection error (re-raised without a copy)"""
+        if not self.contacts_path or not os.path.exists(self.contacts_path):
+            if error is not None:
+                raise error
+            raise FileNotFoundError(f"Keine lokale Kontaktkopie: {self.contacts_path}")
+        if error is not None:
+            print(f"⚠️  Kontakte aus Odoo nicht abrufbar ({error}), nutze {self.contacts_path}")
+        self.contacts = json_io.read_json(self.contacts_path)
+        self._index_contacts()
+    
+    def _index_contacts(self):
+        """
+        Precompute the derived lookup structures for self.contacts.
+        Must be called again whenever self.contacts is replaced.
+        """
+        self._contact_names = tuple(self.contacts.keys())
+        self._contact_name_set = set(self._contact_names)
+        # Choices are normalized once here; only the query is processed per call
+        self._contact_names_processed = [utils.default_process(n) for n in self._contact_names]
+        # Memo for speaker matches, keyed by (name, threshold); reset on reload
+        self._match_cache: Dict[Tuple[str, int], Optional[Dict]] = {}
+    
+    def _remember_match(self, speaker_name: str, threshold: int, match: Optional[Dict]):
+        """Store a match result, evicting the oldest entry when full"""
+        with self._match_lock:
+            if len(self._match_cache) >= self.MATCH_CACHE_SIZE:
+                self._match_cache.pop(next(iter(self._match_cache)), None)
+            self._match_cache[(speaker_name, threshold)] = match
+    
     def match_speaker(self, speaker_name: str, threshold: int = 80) -> Optional[Dict]:
         """
         Match speaker name to Odoo contact using fuzzy matching
@@ -51,37 +159,82 @@ class OdooConnector:
             threshold: Minimum similarity score (0-100)
         
         Returns:
-            Dict with matched contact or None
+            Dict with matched contact or None (cached per name/threshold,
+            treat as read-only)
         """
+        key = (speaker_name, threshold)
+        with self._match_lock:
+            if key in self._match_cache:
+                return self._match_cache[key]
+        
+        match = self._match_speaker_uncached(speaker_name, threshold)
+        self._remember_match(speaker_name, threshold, match)
+        return match
+    
+    def _match_speaker_uncached(self, speaker_name: str, threshold: int) -> Optional[Dict]:
         # Try exact match first
-        if speaker_name in self.contacts:
+        if speaker_name in self._contact_name_set:
             return self.contacts[speaker_name]
         
-        # Fuzzy match
-        match = process.extractOne(speaker_name, self.contacts.keys(), score_cutoff=threshold)
+        # Fuzzy match (WRatio + default_process = fuzzywuzzy-compatible scoring)
+        match = process.extractOne(
+            utils.default_process(speaker_name), self._contact_names_processed,
+            scorer=fuzz.WRatio, processor=None,
+            score_cutoff=threshold
+        )
         
         if match:
-            matched_name = match[0]
-            score = match[1]
-            contact = self.contacts[matched_name]
-            
-            print(f"🔍 Matched '{speaker_name}' → '{matched_name}' (Score: {score})")
-            
-            return {
-                **contact,
-                'matched_name': matched_name,
-                'confidence': score
-            }
+            return self._fuzzy_result(speaker_name, self._contact_names[match[2]], match[1])
         
         print(f"⚠️  Kein Match für '{speaker_name}'")
         return None
     
-    def match_participants(self, names: List[str]) -> List[Dict]:
-        """Match list of participant names to Odoo contacts"""
+    def _fuzzy_result(self, speaker_name: str, matched_name: str, score: float) -> Dict:
+        """Build the match dict for a fuzzy hit"""
+        contact = self.contacts[matched_name]
+        
+        print(f"🔍 Matched '{speaker_name}' → '{matched_name}' (Score: {score:.0f})")
+        
+        return {
+            **contact,
+            'matched_name': matched_name,
+            'confidence': score
+        }
+    
+    def match_participants(self, names: List[str], threshold: int = 80) -> List[Dict]:
+        """
+        Match list of participant names to Odoo contacts
+        
+        Names already in the match cache are reused; the remaining ones are
+        scored against all contacts in one rapidfuzz.cdist call (N×M matrix
+        in C) instead of one extractOne scan per name.
+        """
+        with self._match_lock:
+            pending = [n for n in dict.fromkeys(names)
+                       if (n, threshold) not in self._match_cache
+                       and n not in self._contact_name_set]
+        
+        scores = None
+        if pending and self._contact_names:
+            scores = process.cdist(
+                [utils.default_process(n) for n in pending], self._contact_names_processed,
+                scorer=fuzz.WRatio, processor=None,
+                score_cutoff=threshold
+            )
+        
+        for row, name in enumerate(pending):
+            match = None
+            if scores is not None and scores[row].max() >= threshold:
+                best = int(scores[row].argmax())
+                match = self._fuzzy_result(name, self._contact_names[best], float(scores[row][best]))
+            else:
+                print(f"⚠️  Kein Match für '{name}'")
+            self._remember_match(name, threshold, match)
+        
         results = []
         
         for name in names:
-            match = self.match_speaker(name)
+            match = self.match_speaker(name, threshold)
             if match:
                 results.append({
                     'original_name': name,
@@ -114,12 +267,106 @@ class OdooConnector:
         Returns:
             Created task ID
         """
-        # Match assignee
-        assignee_match = self.match_speaker(action_item['assignee'])
+        user_id = self._resolve_assignees([action_item]).get(action_item['assignee'])
         
-        if not assignee_match:
+        if user_id is None:
             raise ValueError(f"Cannot create task: Assignee '{action_item['assignee']}' not found in Odoo")
         
+        task_data = self._build_task_data(action_item, user_id, project_id)
+        
+        task_id = self.models.execute_kw(
+            self.db, self.uid, self.api_key,
+            'project.task', 'create',
+            [task_data]
+        )
+        
+        print(f"✅ Odoo Task erstellt: ID {task_id}")
+        print(f"   Aufgabe: {action_item['description']}")
+        print(f"   Zugewiesen: {action_item['assignee']} (Odoo User ID: {user_id})")
+        
+        return task_id
+    
+    def create_tasks(self, action_items: List[Dict],
+                     project_id: Optional[int] = None) -> Tuple[List[int], List[Dict]]:
+        """
+        Create several Odoo tasks with a single XML-RPC 'create' call
+        
+        NOTE: Should only be called AFTER human review/approval!
+        
+        Args:
+            action_items: List of action item dicts (see create_task)
+            project_id: Optional Odoo project ID
+        
+        Returns:
+            (task_ids, skipped) – task_ids in the order of the created items,
+            skipped = action items whose assignee could not be resolved
+        """
+        user_ids = self._resolve_assignees(action_items)
+        
+        task_data_list = []
+        created = []
+        skipped = []
+        
+        for ai in action_items:
+            user_id = user_ids.get(ai['assignee'])
+            if user_id is None:
+                print(f"⚠️  Cannot create task: Assignee '{ai['assignee']}' not found in Odoo")
+                skipped.append(ai)
+                continue
+            task_data_list.append(self._build_task_data(ai, user_id, project_id))
+            created.append(ai)
+        
+        if not task_data_list:
+            return [], skipped
+        
+        task_ids = self.models.execute_kw(
+            self.db, self.uid, self.api_key,
+            'project.task', 'create',
+            [task_data_list]
+        )
+        
+        print(f"✅ {len(task_ids)} Odoo Tasks erstellt")
+        for ai, task_id in zip(created, task_ids):
+            print(f"   ID {task_id}: {ai['description']} → {ai['assignee']}")
+        
+        return task_ids, skipped
+    
+    def _resolve_assignees(self, action_items: List[Dict]) -> Dict[str, int]:
+        """
+        Map assignee names to res.users IDs
+        
+        Contacts hold res.partner IDs, but project.task.user_ids expects
+        res.users IDs. All unique assignees are resolved with one
+        res.users search_read on partner_id. Names without a matching
+        contact or without an Odoo user are left out.
+        """
+        partner_by_name = {}
+        for name in {ai['assignee'] for ai in action_items}:
+            match = self.match_speaker(name)
+            if match and match.get('odoo_id'):
+                partner_by_name[name] = match['odoo_id']
+        
+        if not partner_by_name:
+            return {}
+        
+        users = self.models.execute_kw(
+            self.db, self.uid, self.api_key,
+            'res.users', 'search_read',
+            [[['partner_id', 'in', list(set(partner_by_name.values()))]]],
+            {'fields': ['id', 'partner_id']}
+        )
+        # partner_id ist ein many2one: [id, display_name]
+        user_by_partner = {u['partner_id'][0]: u['id'] for u in users if u.get('partner_id')}
+        
+        return {
+            name: user_by_partner[partner_id]
+            for name, partner_id in partner_by_name.items()
+            if partner_id in user_by_partner
+        }
+    
+    def _build_task_data(self, action_item: Dict, user_id: int,
+                         project_id: Optional[int] = None) -> Dict:
+        """Build the project.task values for an action item"""
         # Map priority
         priority_map = {
             'hoch': '3',
@@ -144,7 +391,7 @@ class OdooConnector:
         # Create task
         task_data = {
             'name': action_item['description'],
-            'user_ids': [(4, assignee_match['odoo_id'])],  # Assign to user
+            'user_ids': [(4, user_id)],  # Assign to user
             'priority': priority,
             'description': action_item.get('context', ''),
         }
@@ -155,18 +402,7 @@ class OdooConnector:
         if project_id:
             task_data['project_id'] = project_id
         
-        task_id = self.models.execute_kw(
-            self.db, self.uid, self.api_key,
-            'project.task', 'create',
-            [task_data]
-        )
-        
-        print(f"✅ Odoo Task erstellt: ID {task_id}")
-        print(f"   Aufgabe: {action_item['description']}")
-        print(f"   Zugewiesen: {action_item['assignee']} (Odoo ID: {assignee_match['odoo_id']})")
-        
-        return task_id
-
+        return task_data
 
 def test_odoo():
     """Test function"""
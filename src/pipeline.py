@@ -8,19 +8,38 @@ Flow:
 This is the central orchestrator that ties all modules together.
 """
 
-import json
+import mmap
+import os
+import queue
 import sys
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
-
-from transcription.whisper_transcriber import WhisperTranscriber
-from analysis.claude_analyzer import ClaudeAnalyzer
-from protocol.generator import ProtocolGenerator
-from integrations.odoo_connector import OdooConnector
-from integrations.m365_calendar import M365CalendarContext
-from integrations.memory_store import MemoryStore
+from typing import TYPE_CHECKING, Dict, Optional
+
 from review.review_manager import ReviewSession
+from utils import json_io
+
+# Komponenten (openai, anthropic, jinja2, rapidfuzz, …) werden erst im
+# jeweiligen Property importiert – Export/Review starten ohne Whisper & Co.
+if TYPE_CHECKING:
+    from transcription.whisper_transcriber import WhisperTranscriber
+    from analysis.claude_analyzer import ClaudeAnalyzer
+    from protocol.generator import ProtocolGenerator
+    from integrations.odoo_connector import OdooConnector
+    from integrations.m365_calendar import M365CalendarContext
+    from integrations.memory_store import MemoryStore
+
+# Whisper-Segmente zwischen Transkription und Analyse (Backpressure)
+SEGMENT_QUEUE_SIZE = 256
+_SEGMENTS_END = object()
+
+# Reviewer-Platzhalter im Protokoll-Entwurf, wird beim Export ersetzt
+REVIEWER_PLACEHOLDER = b'Ausstehend'
+
+# Parallele XML-RPC-Aufrufe, falls Tasks einzeln erstellt werden müssen
+ODOO_TASK_WORKERS = 8
 
 
 class MeetingPipeline:
@@ -43,6 +62,7 @@ class MeetingPipeline:
         self._transcriber = None
         self._analyzer = None
         self._generator = None
+        self._render_protocol = None
         self._odoo = None
         self._calendar = None
         self._memory = None
@@ -50,29 +70,40 @@ class MeetingPipeline:
     # ── Lazy Component Init ──────────────────────────────
 
     @property
-    def transcriber(self) -> WhisperTranscriber:
+    def transcriber(self) -> 'WhisperTranscriber':
         if not self._transcriber:
+            from transcription.whisper_transcriber import WhisperTranscriber
             self._transcriber = WhisperTranscriber(self.config.get('transcription', {}))
         return self._transcriber
 
     @property
-    def analyzer(self) -> ClaudeAnalyzer:
+    def analyzer(self) -> 'ClaudeAnalyzer':
         if not self._analyzer:
+            from analysis.claude_analyzer import ClaudeAnalyzer
             self._analyzer = ClaudeAnalyzer(self.config.get('analysis', {}))
         return self._analyzer
 
     @property
-    def generator(self) -> ProtocolGenerator:
+    def generator(self) -> 'ProtocolGenerator':
         if not self._generator:
+            from protocol.generator import ProtocolGenerator
             self._generator = ProtocolGenerator(self.config.get('protocol', {}))
         return self._generator
 
     @property
-    def odoo(self) -> Optional[OdooConnector]:
+    def render_protocol(self):
+        """Auf das Standard-Template spezialisierter Renderer (einmal gebunden)"""
+        if not self._render_protocol:
+            self._render_protocol = self.generator.specialize()
+        return self._render_protocol
+
+    @property
+    def odoo(self) -> Optional['OdooConnector']:
         if self._odoo is None:
             odoo_cfg = self.config.get('odoo', {})
             if odoo_cfg.get('config_path'):
                 try:
+                    from integrations.odoo_connector import OdooConnector
                     self._odoo = OdooConnector(odoo_cfg)
                 except Exception as e:
                     print(f"⚠️  Odoo nicht verfügbar: {e}")
@@ -80,11 +111,12 @@ class MeetingPipeline:
         return self._odoo if self._odoo is not False else None
 
     @property
-    def calendar(self) -> Optional[M365CalendarContext]:
+    def calendar(self) -> Optional['M365CalendarContext']:
         if self._calendar is None:
             cal_cfg = self.config.get('m365', {})
             if cal_cfg.get('enabled', True):
                 try:
+                    from integrations.m365_calendar import M365CalendarContext
                     self._calendar = M365CalendarContext(cal_cfg)
                 except Exception as e:
                     print(f"⚠️  Kalender nicht verfügbar: {e}")
@@ -92,10 +124,12 @@ class MeetingPipeline:
         return self._calendar if self._calendar is not False else None
 
     @property
-    def memory(self) -> Optional[MemoryStore]:
+    def memory(self) -> Optional['MemoryStore']:
         if self._memory is None:
             mem_cfg = self.config.get('memory', {})
-            if mem_cfg.get('index_enabled', True):
+            # 'index_enabled' steuert nur den FTS5-Index im MemoryStore
+            if mem_cfg.get('enabled', True):
+                from integrations.memory_store import MemoryStore
                 self._memory = MemoryStore(mem_cfg)
         return self._memory
 
@@ -116,7 +150,8 @@ class MeetingPipeline:
         if not audio.exists():
             raise FileNotFoundError(f"Audio nicht gefunden: {audio_path}")
 
-        meeting_id = datetime.now().strftime('%Y%m%d-%H%M%S')
+        started = datetime.now()
+        meeting_id = started.strftime('%Y%m%d-%H%M%S')
         output_dir = self.output_base / meeting_id
         output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -124,49 +159,59 @@ class MeetingPipeline:
         print("🎙️  OpenClaw Meeting Assistant")
         print("=" * 60)
 
-        # ── 1. Kalender-Context ──────────────────────────
-        cal_context = {}
-        if self.calendar:
-            print("\n📅 Suche Meeting im Kalender...")
-            cal_context = self.calendar.find_meeting_by_time(datetime.now()) or {}
-            if cal_context:
-                print(f"   Gefunden: {cal_context.get('title')}")
-                if not title:
-                    title = cal_context.get('title', 'Meeting')
-                if not attendees and cal_context.get('attendees'):
-                    attendees = [a['name'] for a in cal_context['attendees']]
-
-        title = title or 'Meeting'
-
-        # ── 2. Transkription ─────────────────────────────
-        print(f"\n📝 Schritt 1/4: Transkription")
-        transcript = self.transcriber.transcribe(str(audio))
-        self.transcriber.save_transcript(transcript, str(output_dir / 'transcript.json'))
-
-        # ── 3. KI-Analyse ────────────────────────────────
-        print(f"\n🧠 Schritt 2/4: KI-Analyse")
-        context = {
-            'title': title,
-            'date': datetime.now().strftime('%d.%m.%Y'),
-            'attendees': attendees or [],
-        }
-        analysis = self.analyzer.analyze(transcript['text'], context)
-        self.analyzer.save_analysis(analysis, str(output_dir / 'analysis.json'))
+        # Kalender-Lookup, Speaker Matching und Transkription laufen parallel;
+        # die Analyse verarbeitet Whisper-Segmente, sobald sie ankommen
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix='pipeline') as pool:
+            # ── 1. Kalender-Context ──────────────────────
+            cal_future = pool.submit(self._lookup_calendar, started)
+
+            # ── 4. Speaker Matching (wartet ggf. auf Kalender-Teilnehmer)
+            def match_attendees():
+                return self._match_participants(
+                    attendees or self._calendar_attendees(cal_future.result())
+                )
+            participants_future = pool.submit(match_attendees)
+
+            # ── 2. Transkription (Segmente → Queue) ──────
+            print(f"\n📝 Schritt 1/4: Transkription")
+            segments = queue.Queue(maxsize=SEGMENT_QUEUE_SIZE)
+            transcript_future = pool.submit(self._transcribe_into, str(audio), segments)
+
+            cal_context = cal_future.result()
+            if not title:
+                title = cal_context.get('title')
+            if not attendees:
+                attendees = self._calendar_attendees(cal_context)
+            title = title or 'Meeting'
+
+            # ── 3. KI-Analyse (läuft während Whisper weiter dekodiert)
+            print(f"\n🧠 Schritt 2/4: KI-Analyse")
+            context = {
+                'title': title,
+                'date': datetime.now().strftime('%d.%m.%Y'),
+                'attendees': attendees or [],
+            }
+            try:
+                analysis = self.analyzer.analyze_parts(
+                    self._segment_windows(segments, self.analyzer.chunk_chars), context
+                )
+            except BaseException:
+                # Transkription nicht an der vollen Queue hängen lassen
+                while not transcript_future.done():
+                    try:
+                        segments.get(timeout=1)
+                    except queue.Empty:
+                        pass
+                raise
+            finally:
+                transcript = transcript_future.result()
+
+            transcript_path = self.transcriber.save_transcript(
+                transcript, str(output_dir / 'transcript.json')
+            )
+            self.analyzer.save_analysis(analysis, str(output_dir / 'analysis.json'))
 
-        # ── 4. Speaker Matching ──────────────────────────
-        participants = []
-        if self.odoo and attendees:
-            print(f"\n👥 Schritt 3/4: Speaker Matching")
-            matched = self.odoo.match_participants(attendees)
-            for m in matched:
-                participants.append({
-                    'name': m.get('matched_name') or m['original_name'],
-                    'email': m.get('email'),
-                    'odoo_id': m.get('odoo_id'),
-                    'present': True,
-                })
-        else:
-            participants = [{'name': n, 'present': True} for n in (attendees or [])]
+            participants = participants_future.result()
 
         # ── 5. Protokoll-Entwurf ─────────────────────────
         print(f"\n📋 Schritt 4/4: Protokoll-Entwurf")
@@ -179,46 +224,186 @@ class MeetingPipeline:
             'participants': participants,
         }
 
-        protocol = self.generator.generate(transcript, analysis, metadata)
+        protocol = self.render_protocol(transcript, analysis, metadata)
         self.generator.save_markdown(protocol, str(output_dir / 'protocol_draft.md'))
 
         # ── 6. Review-Session erstellen ──────────────────
         session = ReviewSession(meeting_id, title)
+        # Die Items übernehmen die Dicts aus analysis (keine Kopie) –
+        # analysis danach nicht mehr verändern
         session.add_from_analysis(analysis)
         session.save(output_dir / 'review_state.json')
 
         # Speichere Metadaten für späteren Export
-        meta_path = output_dir / 'metadata.json'
-        with open(meta_path, 'w', encoding='utf-8') as f:
-            json.dump({
-                'meeting_id': meeting_id,
-                'title': title,
-                'metadata': metadata,
-                'transcript_path': str(output_dir / 'transcript.json'),
-                'analysis_path': str(output_dir / 'analysis.json'),
-                'protocol_draft_path': str(output_dir / 'protocol_draft.md'),
-                'audio_path': str(audio),
-                'cost': {
-                    'transcription': self.transcriber.estimate_cost(transcript.get('duration', 0)),
-                    'analysis_tokens': analysis.get('tokens_used', 0),
-                },
-            }, f, indent=2, ensure_ascii=False)
+        json_io.write_json({
+            'meeting_id': meeting_id,
+            'title': title,
+            'metadata': metadata,
+            'transcript_path': transcript_path,
+            'analysis_path': str(output_dir / 'analysis.json'),
+            'protocol_draft_path': str(output_dir / 'protocol_draft.md'),
+            'audio_path': str(audio),
+            'cost': {
+                'transcription': 0.0 if transcript.get('cached') else
+                                 self.transcriber.estimate_cost(transcript.get('duration', 0)),
+                'analysis_tokens': analysis.get('tokens_used', 0),
+            },
+        }, output_dir / 'metadata.json')
 
         # ── Summary ──────────────────────────────────────
+        # Ein Write statt eines print() pro Zeile
         p = session.progress
-        print("\n" + "=" * 60)
-        print("✅ VERARBEITUNG ABGESCHLOSSEN")
-        print("=" * 60)
-        print(f"   Meeting: {title}")
-        print(f"   Dauer: {transcript.get('duration', 0):.0f}s")
-        print(f"   Action Items: {len(analysis.get('action_items', []))}")
-        print(f"   Entscheidungen: {len(analysis.get('decisions', []))}")
-        print(f"   Offene Fragen: {len(analysis.get('open_questions', []))}")
-        print(f"\n   ⏳ {p['total']} Elemente warten auf Review")
-        print(f"   📁 Output: {output_dir}")
-
+        sys.stdout.write("\n".join((
+            "",
+            "=" * 60,
+            "✅ VERARBEITUNG ABGESCHLOSSEN",
+            "=" * 60,
+            f"   Meeting: {title}",
+            f"   Dauer: {transcript.get('duration', 0):.0f}s",
+            f"   Action Items: {len(analysis.get('action_items', []))}",
+            f"   Entscheidungen: {len(analysis.get('decisions', []))}",
+            f"   Offene Fragen: {len(analysis.get('open_questions', []))}",
+            "",
+            f"   ⏳ {p['total']} Elemente warten auf Review",
+            f"   📁 Output: {output_dir}",
+            "",
+        )))
+
+        session.flush()
         return session
 
+    def _transcribe_into(self, audio_path: str, segments: queue.Queue) -> Dict:
+        """Transkribieren und Segmente laufend in die Queue stellen"""
+        stream = self.transcriber.iter_segments(audio_path)
+        sent = False
+        end = _SEGMENTS_END
+        try:
+            while True:
+                segments.put(next(stream))
+                sent = True
+        except StopIteration as done:
+            transcript = done.value
+            if not sent and transcript['text']:
+                # Antwort ohne Segmente: ganzer Text als ein Segment
+                segments.put({'text': transcript['text']})
+            return transcript
+        except BaseException as e:
+            # Fehler statt Ende-Marker: die Analyse bricht ab, statt auf
+            # einem gekürzten Transkript weiterzuarbeiten
+            end = e
+            raise
+        finally:
+            segments.put(end)
+
+    @staticmethod
+    def _segment_windows(segments: queue.Queue, max_chars: int):
+        """
+        Segmente aus der Queue zu Analyse-Teilen von max. max_chars bündeln;
+        ein Transkriptionsfehler aus der Queue wird hier erneut geworfen
+        """
+        window, size = [], 0
+        while (seg := segments.get()) is not _SEGMENTS_END:
+            if isinstance(seg, BaseException):
+                raise seg
+            text = seg['text']
+            if window and size + 1 + len(text) > max_chars:
+                yield ' '.join(window)
+                window, size = [], 0
+            window.append(text)
+            size += len(text) + 1
+        if window:
+            yield ' '.join(window)
+
+    def _lookup_calendar(self, meeting_time: datetime) -> Dict:
+        """Kalender-Eintrag zur Aufnahmezeit, {} wenn keiner gefunden"""
+        if not self.calendar:
+            return {}
+        print("\n📅 Suche Meeting im Kalender...")
+        cal_context = self.calendar.find_meeting_by_time(meeting_time) or {}
+        if cal_context:
+            print(f"   Gefunden: {cal_context.get('title')}")
+        return cal_context
+
+    @staticmethod
+    def _calendar_attendees(cal_context: Dict) -> list:
+        return [a['name'] for a in cal_context.get('attendees') or []]
+
+    def _match_participants(self, attendees: list) -> list:
+        """Teilnehmer gegen Odoo-Kontakte matchen (falls verfügbar)"""
+        if not (self.odoo and attendees):
+            return [{'name': n, 'present': True} for n in (attendees or [])]
+
+        print(f"\n👥 Schritt 3/4: Speaker Matching")
+        participants = []
+        for m in self.odoo.match_participants(attendees):
+            participants.append({
+                'name': m.get('matched_name') or m['original_name'],
+                'email': m.get('email'),
+                'odoo_id': m.get('odoo_id'),
+                'present': True,
+            })
+        return participants
+
+    @staticmethod
+    def _finalize_draft(draft_path: Path, final_path: Path, reviewers: bytes) -> bool:
+        """
+        Ersetze REVIEWER_PLACEHOLDER im Entwurf und schreibe final_path.
+
+        Der Entwurf wird per mmap gelesen und stückweise in eine temporäre
+        Datei im Zielordner geschrieben, die danach atomar umbenannt wird –
+        keine Kopie des ganzen Protokolls im Speicher.
+        Returns False, wenn es keinen Entwurf gibt.
+        """
+        try:
+            draft = open(draft_path, 'rb')
+        except FileNotFoundError:
+            return False
+
+        # Eigene temporäre Datei statt NamedTemporaryFile (0600): mit 0666
+        # wendet der Kernel die aktuelle umask an, wie bei open(..., 'w')
+        tmp_path = final_path.parent / f'.{final_path.name}.{os.urandom(4).hex()}'
+        fd = os.open(tmp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        with draft, open(fd, 'wb') as tmp:
+            try:
+                if os.fstat(draft.fileno()).st_size:  # mmap geht nicht für leere Dateien
+                    with mmap.mmap(draft.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                            memoryview(mm) as view:
+                        start = 0
+                        while (idx := mm.find(REVIEWER_PLACEHOLDER, start)) != -1:
+                            tmp.write(view[start:idx])
+                            tmp.write(reviewers)
+                            start = idx + len(REVIEWER_PLACEHOLDER)
+                        tmp.write(view[start:])
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+        # Rechte einer bisherigen Datei übernehmen
+        try:
+            os.chmod(tmp_path, os.stat(final_path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, final_path)
+        return True
+
+    def _create_tasks_individually(self, action_items: list):
+        """Odoo Tasks parallel einzeln erstellen, Fehler pro Item"""
+        odoo = self.odoo  # Property nicht aus mehreren Threads initialisieren
+        with ThreadPoolExecutor(max_workers=min(ODOO_TASK_WORKERS, len(action_items)),
+                                thread_name_prefix='odoo') as pool:
+            results = list(pool.map(lambda ai: self._safe_create_task(odoo, ai), action_items))
+        for ai, task_id in results:
+            if task_id is not None:
+                ai['odoo_task_id'] = task_id
+
+    @staticmethod
+    def _safe_create_task(odoo: 'OdooConnector', action_item: Dict):
+        try:
+            return action_item, odoo.create_task(action_item)
+        except Exception as e:
+            print(f"   ⚠️  Task-Erstellung fehlgeschlagen ({action_item.get('description')}): {e}")
+            return action_item, None
+
     # ── Export (nach Review) ─────────────────────────────
 
     def export(self, session: ReviewSession, output_dir: Path = None):
@@ -226,6 +411,7 @@ class MeetingPipeline:
         Exportiere freigegebene Elemente.
         Darf NUR aufgerufen werden wenn session.is_complete == True.
         """
+        session.flush()
         if not session.is_complete:
             pending = session.progress['pending']
             raise RuntimeError(
@@ -241,40 +427,38 @@ class MeetingPipeline:
         approved_actions = session.get_approved_action_items()
         if approved_actions and self.odoo:
             print(f"\n📌 Erstelle {len(approved_actions)} Odoo Tasks...")
-            for ai in approved_actions:
-                try:
-                    task_id = self.odoo.create_task(ai)
+            try:
+                task_ids, skipped = self.odoo.create_tasks(approved_actions)
+                skipped_ids = {id(ai) for ai in skipped}
+                created = [ai for ai in approved_actions if id(ai) not in skipped_ids]
+                for ai, task_id in zip(created, task_ids):
                     ai['odoo_task_id'] = task_id
-                except Exception as e:
-                    print(f"   ⚠️  Task-Erstellung fehlgeschlagen: {e}")
+            except xmlrpc.client.Fault as e:
+                # Ein ungültiger Datensatz lässt den ganzen Batch scheitern. Nur bei
+                # einer Ablehnung durch den Server einzeln nachholen: nach Timeout
+                # oder Verbindungsabbruch kann der Batch schon angelegt sein
+                print(f"   ⚠️  Sammel-Erstellung abgelehnt ({e.faultString}), erstelle einzeln...")
+                self._create_tasks_individually(approved_actions)
 
         # 2. Finales Protokoll (mit Review-Status)
         final_protocol_path = output_dir / 'protocol_final.md'
         # Rebuild protocol with approved data only
         print(f"\n📋 Erstelle finales Protokoll...")
         # (In production würde man das Protokoll mit den approved_data neu generieren)
-        if (output_dir / 'protocol_draft.md').exists():
-            draft = (output_dir / 'protocol_draft.md').read_text(encoding='utf-8')
-            reviewed_by = set()
-            for item in session.get_approved():
-                if item.reviewed_by:
-                    reviewed_by.add(item.reviewed_by)
-
-            final = draft.replace(
-                'Ausstehend',
-                ', '.join(reviewed_by) or 'Automatisch'
-            )
-            final_protocol_path.write_text(final, encoding='utf-8')
+        reviewed_by = {item.reviewed_by for item in session.get_approved()
+                       if item.reviewed_by}
+        # UTF-8 bleibt beim Ersetzen gültig → kein Decode/Encode nötig
+        if self._finalize_draft(output_dir / 'protocol_draft.md', final_protocol_path,
+                                (', '.join(reviewed_by) or 'Automatisch').encode('utf-8')):
             print(f"   💾 {final_protocol_path}")
 
         # 3. Memory (Wissensbasis)
         if self.memory:
             print(f"\n🧠 Speichere in Wissensbasis...")
-            meta_path = output_dir / 'metadata.json'
-            metadata = {}
-            if meta_path.exists():
-                metadata = json.loads(meta_path.read_text())
-                metadata = metadata.get('metadata', {})
+            try:
+                metadata = json_io.read_json(output_dir / 'metadata.json').get('metadata', {})
+            except FileNotFoundError:
+                metadata = {}
 
             analysis_approved = {
                 'summary': session.get_approved_summary() or '',
@@ -284,8 +468,13 @@ class MeetingPipeline:
                                    if i.status == 'approved'],
                 'key_topics': [],
             }
+            try:
+                final = final_protocol_path.read_bytes()
+            except FileNotFoundError:
+                final = b''
+
             mem_path = self.memory.save_meeting(
-                final_protocol_path.read_text(encoding='utf-8') if final_protocol_path.exists() else '',
+                final.decode('utf-8'),
                 analysis_approved,
                 metadata,
             )
@@ -293,9 +482,13 @@ class MeetingPipeline:
 
         # 4. Zusammenfassung
         p = session.progress
-        print(f"\n✅ Export abgeschlossen!")
-        print(f"   ✅ {p['approved']} Elemente exportiert")
-        print(f"   ❌ {p['rejected']} Elemente abgelehnt (übersprungen)")
+        sys.stdout.write("\n".join((
+            "",
+            "✅ Export abgeschlossen!",
+            f"   ✅ {p['approved']} Elemente exportiert",
+            f"   ❌ {p['rejected']} Elemente abgelehnt (übersprungen)",
+            "",
+        )))
 
 
 def load_config(config_path: str = None) -> Dict:
@@ -307,5 +500,4 @@ def load_config(config_path: str = None) -> Dict:
         if not path.exists():
             path = Path(__file__).parent.parent / 'config.json.example'
 
-    with open(path, 'r') as f:
-        return json.load(f)
+    return json_io.read_json(path)
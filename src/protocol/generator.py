@@ -8,8 +8,10 @@ import os
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
-from jinja2 import Template
+from typing import Callable, Dict, List, Union
+from jinja2 import Environment, FileSystemLoader, TemplateNotFound
+
+PROTOCOL_VERSION = '1.0.0'
 
 class ProtocolGenerator:
     """Generate meeting protocols from analysis results"""
@@ -19,6 +21,11 @@ class ProtocolGenerator:
         self.template_dir = Path(__file__).parent.parent.parent / "templates"
         self.default_template = config.get('default_template', 'qps-standard')
         self.language = config.get('language', 'de')
+        # Templates werden einmal kompiliert und im Environment gecacht
+        self._env = Environment(
+            loader=FileSystemLoader(str(self.template_dir)),
+            auto_reload=False
+        )
     
     def generate(self, 
                  transcript: Dict,
@@ -37,46 +44,54 @@ class ProtocolGenerator:
         Returns:
             Markdown protocol text
         """
-        print("📋 Erstelle Protokoll...")
-        
-        if not template_name:
-            template_name = self.default_template
-        
-        # Load template
-        template_path = self.template_dir / f"protocol-{template_name}.md"
-        if not template_path.exists():
-            raise FileNotFoundError(f"Template not found: {template_path}")
-        
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_text = f.read()
-        
-        template = Template(template_text)
-        
-        # Prepare data for template
-        data = {
-            'title': metadata.get('title', 'Meeting-Protokoll'),
-            'date': metadata.get('date', datetime.now().strftime('%d.%m.%Y')),
-            'start_time': metadata.get('start_time', ''),
-            'end_time': metadata.get('end_time', ''),
-            'location': metadata.get('location', 'Online'),
-            'participants': metadata.get('participants', []),
-            'summary': analysis.get('summary', ''),
-            'action_items': analysis.get('action_items', []),
-            'decisions': analysis.get('decisions', []),
-            'open_questions': analysis.get('open_questions', []),
-            'topics': self._extract_topics(analysis),
-            'next_steps': analysis.get('next_steps', ''),
-            'created_at': datetime.now().strftime('%d.%m.%Y %H:%M'),
-            'version': '1.0.0',
-            'reviewed_by': metadata.get('reviewed_by', '')
-        }
+        return self.specialize(template_name)(transcript, analysis, metadata)
+    
+    def specialize(self, template_name: str = None) -> Callable[[Dict, Dict, Dict], str]:
+        """
+        Bind one template and return render(transcript, analysis, metadata) -> str
         
-        # Render protocol
-        protocol = template.render(**data)
+        Template lookup and compilation happen once here; the returned
+        function only builds the per-meeting data and renders.
+        """
+        template = self._load_template(template_name or self.default_template)
+        render_template = template.render
+        extract_topics = self._extract_topics
         
-        print(f"✅ Protokoll erstellt ({len(protocol)} Zeichen)")
+        def render(transcript: Dict, analysis: Dict, metadata: Dict) -> str:
+            print("📋 Erstelle Protokoll...")
+            
+            now = datetime.now()
+            protocol = render_template({
+                'title': metadata.get('title', 'Meeting-Protokoll'),
+                'date': metadata.get('date', now.strftime('%d.%m.%Y')),
+                'start_time': metadata.get('start_time', ''),
+                'end_time': metadata.get('end_time', ''),
+                'location': metadata.get('location', 'Online'),
+                'participants': metadata.get('participants', []),
+                'summary': analysis.get('summary', ''),
+                'action_items': analysis.get('action_items', []),
+                'decisions': analysis.get('decisions', []),
+                'open_questions': analysis.get('open_questions', []),
+                'topics': extract_topics(analysis),
+                'next_steps': analysis.get('next_steps', ''),
+                'created_at': now.strftime('%d.%m.%Y %H:%M'),
+                'version': PROTOCOL_VERSION,
+                'reviewed_by': metadata.get('reviewed_by', '')
+            })
+            
+            print(f"✅ Protokoll erstellt ({len(protocol)} Zeichen)")
+            
+            return protocol
         
-        return protocol
+        return render
+    
+    def _load_template(self, template_name: str):
+        """Compiled template protocol-<name>.md (cached after the first call)"""
+        filename = f"protocol-{template_name}.md"
+        try:
+            return self._env.get_template(filename)
+        except TemplateNotFound:
+            raise FileNotFoundError(f"Template not found: {self.template_dir / filename}")
     
     def _extract_topics(self, analysis: Dict) -> List[Dict]:
         """Extract topics with their content from analysis"""
@@ -86,11 +101,17 @@ class ProtocolGenerator:
         key_topics = analysis.get('key_topics', [])
         
         if key_topics:
-            for i, topic_title in enumerate(key_topics):
+            # Beschreibungen nur einmal in Kleinbuchstaben umwandeln
+            decisions_lower = [
+                (d, d['description'].lower()) for d in analysis.get('decisions', [])
+            ]
+            
+            for topic_title in key_topics:
                 # Find related decisions
+                keywords = topic_title.lower().split()
                 decisions = [
-                    d for d in analysis.get('decisions', [])
-                    if any(keyword in d['description'].lower() for keyword in topic_title.lower().split())
+                    d for d, description in decisions_lower
+                    if any(keyword in description for keyword in keywords)
                 ]
                 
                 topics.append({
@@ -101,10 +122,11 @@ class ProtocolGenerator:
         
         return topics
     
-    def save_markdown(self, protocol: str, output_path: str):
-        """Save protocol as Markdown file"""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(protocol)
+    def save_markdown(self, protocol: Union[str, bytes], output_path: str):
+        """Save protocol as Markdown file (str or already UTF-8 encoded bytes)"""
+        if isinstance(protocol, str):
+            protocol = protocol.encode('utf-8')
+        Path(output_path).write_bytes(protocol)
         print(f"💾 Markdown gespeichert: {output_path}")
     
     def save_pdf(self, protocol: str, output_path: str):
@@ -6,48 +6,90 @@ Kernprinzip: NICHTS wird automatisch exportiert!
 Jedes erkannte Element durchläuft den 3-Stufen-Zyklus:
   draft → approved/rejected
 
-Der ReviewManager speichert den Status lokal als JSON.
+Der ReviewManager speichert den Status lokal als JSON (orjson falls installiert).
 """
 
-import json
-import uuid
+import atexit
+import secrets
+import threading
+import weakref
+from collections import defaultdict
 from datetime import datetime
+from operator import attrgetter
 from pathlib import Path
-from typing import Dict, List, Optional, Literal
-from copy import deepcopy
+from typing import Callable, Dict, List, Optional, Literal
+
+from utils import json_io
 
 ReviewStatus = Literal['draft', 'approved', 'rejected']
 
+# Felder von ReviewableItem.to_dict (Reihenfolge = JSON-Reihenfolge)
+_ITEM_KEYS = (
+    'id', 'kind', 'status', 'original_data', 'approved_data',
+    'reviewed_by', 'reviewed_at', 'reject_reason',
+)
+_item_values = attrgetter(*_ITEM_KEYS)
+
+# Schnelle Klickfolgen (Telegram) werden zu einem Schreibvorgang zusammengefasst
+SAVE_DEBOUNCE_SECONDS = 0.5
+
+_unsaved_sessions: 'weakref.WeakSet[ReviewSession]' = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_unsaved_sessions():
+    for session in list(_unsaved_sessions):
+        session.flush()
+
 
 class ReviewableItem:
     """Ein Element das geprüft werden muss"""
 
-    def __init__(self, kind: str, data: Dict):
-        self.id = str(uuid.uuid4())[:8]
+    __slots__ = (
+        'id', 'kind', 'status', 'original_data', 'approved_data',
+        'reviewed_by', 'reviewed_at', 'reject_reason', '_on_status_change',
+    )
+
+    def __init__(self, kind: str, data: Dict, item_id: str = None):
+        # data wird übernommen, nicht kopiert (frisch aus der Analyse/JSON)
+        # Innerhalb einer ReviewSession vergibt die Session fortlaufende IDs
+        self.id = item_id or secrets.token_hex(4)
         self.kind = kind  # 'action_item', 'decision', 'open_question', 'summary'
         self.status: ReviewStatus = 'draft'
-        self.original_data = deepcopy(data)
+        self.original_data = data
         self.approved_data: Optional[Dict] = None
         self.reviewed_by: Optional[str] = None
         self.reviewed_at: Optional[str] = None
         self.reject_reason: Optional[str] = None
+        # Wird von der ReviewSession gesetzt, hält deren Index aktuell
+        self._on_status_change: Optional[Callable[['ReviewableItem', str], None]] = None
+
+    def _set_status(self, status: ReviewStatus):
+        old_status, self.status = self.status, status
+        if self._on_status_change and old_status != status:
+            self._on_status_change(self, old_status)
 
     def approve(self, reviewer: str, changes: Dict = None):
         """Element freigeben, optional mit Änderungen"""
-        self.status = 'approved'
+        self._approve(reviewer, datetime.now().isoformat(), changes)
+
+    def _approve(self, reviewer: str, reviewed_at: str, changes: Dict = None):
+        """approve() mit vorgegebenem Zeitstempel (Batch: einer für alle)"""
         self.reviewed_by = reviewer
-        self.reviewed_at = datetime.now().isoformat()
+        self.reviewed_at = reviewed_at
         if changes:
             self.approved_data = {**self.original_data, **changes}
         else:
-            self.approved_data = deepcopy(self.original_data)
+            # flache Kopie: Export ergänzt Felder (odoo_task_id) nur hier
+            self.approved_data = dict(self.original_data)
+        self._set_status('approved')
 
     def reject(self, reviewer: str, reason: str = None):
         """Element ablehnen"""
-        self.status = 'rejected'
         self.reviewed_by = reviewer
         self.reviewed_at = datetime.now().isoformat()
         self.reject_reason = reason
+        self._set_status('rejected')
 
     @property
     def data(self) -> Dict:
@@ -55,21 +97,11 @@ class ReviewableItem:
         return self.approved_data or self.original_data
 
     def to_dict(self) -> Dict:
-        return {
-            'id': self.id,
-            'kind': self.kind,
-            'status': self.status,
-            'original_data': self.original_data,
-            'approved_data': self.approved_data,
-            'reviewed_by': self.reviewed_by,
-            'reviewed_at': self.reviewed_at,
-            'reject_reason': self.reject_reason,
-        }
+        return dict(zip(_ITEM_KEYS, _item_values(self)))
 
     @classmethod
     def from_dict(cls, d: Dict) -> 'ReviewableItem':
-        item = cls(d['kind'], d['original_data'])
-        item.id = d['id']
+        item = cls(d['kind'], d['original_data'], d['id'])
         item.status = d['status']
         item.approved_data = d.get('approved_data')
         item.reviewed_by = d.get('reviewed_by')
@@ -78,6 +110,13 @@ class ReviewableItem:
         return item
 
 
+def _state_default(obj):
+    """Items als dict, alles andere (datetime, Path, set, …) über json_io"""
+    if isinstance(obj, ReviewableItem):
+        return obj.to_dict()
+    return json_io.to_builtin(obj)
+
+
 class ReviewSession:
     """Eine komplette Review-Session für ein Meeting"""
 
@@ -89,64 +128,113 @@ class ReviewSession:
         self.summary_item: Optional[ReviewableItem] = None
         self._state_path: Optional[Path] = None
 
+        # Indizes statt linearer Scans über self.items
+        self._by_id: Dict[str, ReviewableItem] = {}
+        self._position: Dict[str, int] = {}
+        self._next_id = 0
+        self._by_status: Dict[str, Dict[str, ReviewableItem]] = {
+            'draft': {}, 'approved': {}, 'rejected': {},
+        }
+        self._by_kind: Dict[str, Dict[str, ReviewableItem]] = defaultdict(dict)
+        self._progress: Optional[Dict] = None  # Cache, None = veraltet
+
+        # Autosave nach Review-Aktionen (debounced, siehe _mark_dirty)
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        # Schützt Items/Indizes: Mutatoren und das Speichern aus dem Timer-Thread
+        self._lock = threading.RLock()
+
+    def _new_item(self, kind: str, data: Dict) -> ReviewableItem:
+        """Neues Element mit fortlaufender, in der Session eindeutiger ID"""
+        item_id = f"{self._next_id:08x}"
+        while item_id in self._by_id:  # geladene Sessions mit Alt-IDs
+            self._next_id += 1
+            item_id = f"{self._next_id:08x}"
+        self._next_id += 1
+        return ReviewableItem(kind, data, item_id)
+
+    def _add(self, item: ReviewableItem):
+        """Element anhängen und indexieren"""
+        self._position[item.id] = len(self.items)
+        self.items.append(item)
+        self._by_id[item.id] = item
+        self._by_status[item.status][item.id] = item
+        self._by_kind[item.kind][item.id] = item
+        item._on_status_change = self._status_changed
+        self._progress = None
+
+    def _status_changed(self, item: ReviewableItem, old_status: str):
+        del self._by_status[old_status][item.id]
+        self._by_status[item.status][item.id] = item
+        self._progress = None
+
+    def _in_order(self, items: Dict[str, ReviewableItem]) -> List[ReviewableItem]:
+        """Index-Einträge in der Reihenfolge von self.items"""
+        return sorted(items.values(), key=lambda i: self._position[i.id])
+
     def add_from_analysis(self, analysis: Dict):
         """Erstelle ReviewableItems aus der KI-Analyse"""
-
-        # Zusammenfassung
-        if analysis.get('summary'):
-            self.summary_item = ReviewableItem('summary', {
-                'text': analysis['summary']
-            })
-            self.items.append(self.summary_item)
-
-        # Action Items
-        for ai in analysis.get('action_items', []):
-            self.items.append(ReviewableItem('action_item', ai))
-
-        # Entscheidungen
-        for dec in analysis.get('decisions', []):
-            self.items.append(ReviewableItem('decision', dec))
-
-        # Offene Fragen
-        for q in analysis.get('open_questions', []):
-            self.items.append(ReviewableItem('open_question', q))
+        with self._lock:
+            # Zusammenfassung
+            if analysis.get('summary'):
+                self.summary_item = self._new_item('summary', {
+                    'text': analysis['summary']
+                })
+                self._add(self.summary_item)
+
+            # Action Items
+            for ai in analysis.get('action_items', []):
+                self._add(self._new_item('action_item', ai))
+
+            # Entscheidungen
+            for dec in analysis.get('decisions', []):
+                self._add(self._new_item('decision', dec))
+
+            # Offene Fragen
+            for q in analysis.get('open_questions', []):
+                self._add(self._new_item('open_question', q))
 
     # ── Zugriff ──────────────────────────────────────────
 
     def get_pending(self) -> List[ReviewableItem]:
         """Alle ungeprüften Elemente"""
-        return [i for i in self.items if i.status == 'draft']
+        # Drafts werden nie neu eingefügt → Index ist bereits in Reihenfolge
+        return list(self._by_status['draft'].values())
 
     def get_approved(self) -> List[ReviewableItem]:
-        return [i for i in self.items if i.status == 'approved']
+        return self._in_order(self._by_status['approved'])
 
     def get_rejected(self) -> List[ReviewableItem]:
-        return [i for i in self.items if i.status == 'rejected']
+        return self._in_order(self._by_status['rejected'])
 
     def get_by_kind(self, kind: str) -> List[ReviewableItem]:
-        return [i for i in self.items if i.kind == kind]
+        return list(self._by_kind.get(kind, {}).values())
 
     def get_by_id(self, item_id: str) -> Optional[ReviewableItem]:
-        for i in self.items:
-            if i.id == item_id:
-                return i
-        return None
+        return self._by_id.get(item_id)
 
     @property
     def is_complete(self) -> bool:
         """Alle Elemente geprüft?"""
-        return all(i.status != 'draft' for i in self.items)
+        return not self._by_status['draft']
 
     @property
     def progress(self) -> Dict:
+        """Review-Fortschritt (gecacht bis zur nächsten Änderung, nicht verändern)"""
+        if self._progress is None:
+            self._progress = self._count_progress()
+        return self._progress
+
+    def _count_progress(self) -> Dict:
         total = len(self.items)
-        reviewed = sum(1 for i in self.items if i.status != 'draft')
+        pending = len(self._by_status['draft'])
+        reviewed = total - pending
         return {
             'total': total,
             'reviewed': reviewed,
-            'pending': total - reviewed,
-            'approved': sum(1 for i in self.items if i.status == 'approved'),
-            'rejected': sum(1 for i in self.items if i.status == 'rejected'),
+            'pending': pending,
+            'approved': len(self._by_status['approved']),
+            'rejected': len(self._by_status['rejected']),
             'percent': int(reviewed / total * 100) if total else 100,
         }
 
@@ -154,28 +242,35 @@ class ReviewSession:
 
     def approve_all(self, reviewer: str):
         """Alle Draft-Items freigeben (Schnell-Modus)"""
-        for item in self.get_pending():
-            item.approve(reviewer)
+        reviewed_at = datetime.now().isoformat()
+        with self._lock:
+            for item in self.get_pending():
+                item._approve(reviewer, reviewed_at)
+            self._mark_dirty()
 
     def approve_item(self, item_id: str, reviewer: str, changes: Dict = None):
-        item = self.get_by_id(item_id)
-        if item:
-            item.approve(reviewer, changes)
+        with self._lock:
+            item = self.get_by_id(item_id)
+            if item:
+                item.approve(reviewer, changes)
+                self._mark_dirty()
 
     def reject_item(self, item_id: str, reviewer: str, reason: str = None):
-        item = self.get_by_id(item_id)
-        if item:
-            item.reject(reviewer, reason)
+        with self._lock:
+            item = self.get_by_id(item_id)
+            if item:
+                item.reject(reviewer, reason)
+                self._mark_dirty()
 
     # ── Export (nur freigegebene!) ────────────────────────
 
     def get_approved_action_items(self) -> List[Dict]:
-        return [i.data for i in self.items
-                if i.kind == 'action_item' and i.status == 'approved']
+        return [i.data for i in self._by_kind['action_item'].values()
+                if i.status == 'approved']
 
     def get_approved_decisions(self) -> List[Dict]:
-        return [i.data for i in self.items
-                if i.kind == 'decision' and i.status == 'approved']
+        return [i.data for i in self._by_kind['decision'].values()
+                if i.status == 'approved']
 
     def get_approved_summary(self) -> Optional[str]:
         if self.summary_item and self.summary_item.status == 'approved':
@@ -184,13 +279,42 @@ class ReviewSession:
 
     # ── Persistenz ───────────────────────────────────────
 
+    def _mark_dirty(self):
+        """Änderung vormerken; gespeichert wird SAVE_DEBOUNCE_SECONDS nach der letzten"""
+        if not self._state_path:
+            return  # noch nie gespeichert → kein Autosave
+        with self._lock:
+            self._dirty = True
+            if self._flush_timer:
+                self._flush_timer.cancel()
+            self._flush_timer = threading.Timer(SAVE_DEBOUNCE_SECONDS, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+        _unsaved_sessions.add(self)
+
+    def flush(self):
+        """Vorgemerkte Änderungen sofort speichern"""
+        with self._lock:
+            if self._dirty:
+                self.save()
+
     def save(self, path: Path = None):
         """Speichere Review-State als JSON"""
-        if path:
-            self._state_path = path
-        if not self._state_path:
-            raise ValueError("Kein Speicherpfad definiert")
+        with self._lock:
+            if path:
+                self._state_path = path
+            if not self._state_path:
+                raise ValueError("Kein Speicherpfad definiert")
+
+            if self._flush_timer:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._dirty = False
+            _unsaved_sessions.discard(self)
+
+            self._write_state()
 
+    def _write_state(self):
         self._state_path.parent.mkdir(parents=True, exist_ok=True)
 
         data = {
@@ -198,16 +322,15 @@ class ReviewSession:
             'title': self.title,
             'created_at': self.created_at,
             'progress': self.progress,
-            'items': [i.to_dict() for i in self.items],
+            'items': self.items,
         }
 
-        with open(self._state_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Items werden direkt beim Serialisieren umgewandelt (keine Zwischenliste)
+        json_io.write_json(data, self._state_path, default=_state_default)
 
     @classmethod
     def load(cls, path: Path) -> 'ReviewSession':
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = json_io.read_json(path)
 
         session = cls(data['meeting_id'], data['title'])
         session.created_at = data['created_at']
@@ -215,7 +338,7 @@ class ReviewSession:
 
         for item_data in data.get('items', []):
             item = ReviewableItem.from_dict(item_data)
-            session.items.append(item)
+            session._add(item)
             if item.kind == 'summary':
                 session.summary_item = item
 
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+On-disk cache for transcription results
+Keyed by a hash of the audio content + model + language, so re-running the
+pipeline on the same recording does not pay for the API call again.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from utils import json_io
+
+try:
+    import blake3  # optional: SIMD + multi-threaded, deutlich schneller als blake2b
+except ImportError:
+    blake3 = None
+
+# Standardwerte (überschreibbar über die transcription-Config)
+DEFAULT_CACHE_DIR = '~/.cache/openclaw/transcripts'
+DEFAULT_TTL_DAYS = 90
+DEFAULT_SIZE_LIMIT_MB = 1024
+
+# Zeichen, die in Cache-Dateinamen unverändert bleiben dürfen
+_UNSAFE_NAME_RE = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+def audio_digest(audio_path: Union[str, Path]) -> str:
+    """
+    Hash over the complete audio content (hex), never sampled: two recordings
+    with the same long silent intro must not collide. The file size goes in
+    first, so files differing only in length get different keys.
+    
+    The file is memory-mapped and hashed straight from the page cache,
+    without copying it into Python bytes.
+    """
+    if blake3 is not None:
+        h = blake3.blake3(max_threads=blake3.blake3.AUTO)
+    else:
+        h = hashlib.blake2b(digest_size=16)
+    
+    with open(audio_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        h.update(size.to_bytes(8, 'little'))
+        if size:  # leere Dateien lassen sich nicht mappen
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+    return h.hexdigest()[:32]
+
+
+class TranscriptCache:
+    """
+    One JSON file per transcript, bounded by age (TTL) and total size (LRU)
+
+    A hit refreshes the file's mtime, eviction removes the least recently
+    used files first. The TTL is checked against the stored 'cached_at'.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR,
+                 ttl_days: float = DEFAULT_TTL_DAYS,
+                 size_limit_mb: int = DEFAULT_SIZE_LIMIT_MB):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.ttl = ttl_days * 86400
+        self.size_limit = size_limit_mb << 20
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional['TranscriptCache']:
+        """Cache from the transcription config, None when 'cache' is false"""
+        if not config.get('cache', True):
+            return None
+        return cls(
+            config.get('cache_dir', DEFAULT_CACHE_DIR),
+            config.get('cache_ttl_days', DEFAULT_TTL_DAYS),
+            config.get('cache_size_mb', DEFAULT_SIZE_LIMIT_MB)
+        )
+
+    @staticmethod
+    def key(audio_path: str, model: str, language: str, timestamps: bool = True) -> str:
+        """
+        Audio digest + model/language part, safe as a file name
+
+        Model ids like "Systran/faster-whisper-large-v3" or local model paths
+        contain '/': the readable part is sanitized and shortened, a hash of
+        the raw values keeps different models apart.
+        """
+        # Ohne Zeitstempel (nur Text) eigener Eintrag, sonst fehlen später Segmente
+        variant = f"{model}\0{language}\0{'segments' if timestamps else 'text'}"
+        variant_hash = hashlib.blake2b(variant.encode('utf-8'), digest_size=6).hexdigest()
+        label = _UNSAFE_NAME_RE.sub('_', f"{Path(model).name}-{language}")[:48]
+        return f"{audio_digest(audio_path)}-{label}-{variant_hash}"
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached transcript or None (missing, expired or unreadable)"""
+        path = self._path(key)
+        try:
+            entry = json_io.read_json(path)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            path.unlink(missing_ok=True)
+            return None
+
+        if time.time() - entry.get('cached_at', 0) > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+
+        os.utime(path)  # LRU: zuletzt benutzt
+        return entry['transcript']
+
+    def set(self, key: str, transcript: Dict):
+        """Store a transcript, then evict old entries above the size limit"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        # Erst temporär schreiben: ein abgebrochener Lauf hinterlässt keine halbe Datei
+        tmp_path = path.with_suffix('.tmp')
+        json_io.write_bytes(
+            json_io.dumps({'cached_at': time.time(), 'transcript': transcript}, indent=False),
+            tmp_path
+        )
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob('*.json'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= self.size_limit:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            path.unlink(missing_ok=True)
+            total -= size
+            if total <= self.size_limit:
+                break
@@ -1,26 +1,240 @@
 #!/usr/bin/env python3
 """
 Whisper-based transcription module
-Supports: OpenAI Whisper API, local whisper.cpp
+Supports: OpenAI Whisper API, local faster-whisper (batched), local whisper.cpp
 """
 
 import os
-import json
+import re
+import time
+import atexit
+import shutil
+import importlib.util
+import mimetypes
+import asyncio
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, List
-from openai import OpenAI
+from typing import Optional, Dict, Generator, List, Tuple, Union
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import ormsgpack  # optional: binäres Format für Zwischenartefakte
+except ImportError:
+    ormsgpack = None
+
+try:
+    import zstandard  # optional: komprimierte Transkripte (.zst)
+except ImportError:
+    zstandard = None
+
+from utils import json_io
+from transcription.transcript_cache import TranscriptCache
+
+# Sekunden für Upload + Transkription einer Datei
+TRANSCRIPTION_TIMEOUT = 600
+
+# Ein Connection-Pool für alle Transkriber/Shards (TLS-Handshake nur einmal)
+HTTP_POOL_LIMITS = dict(max_keepalive_connections=32, max_connections=64)
+HTTP_CONNECT_TIMEOUT = 10.0
+
+# Lesepuffer für den Upload (weniger read()-Syscalls bei grossen WAV-Dateien)
+UPLOAD_BUFFER_SIZE = 1 << 20
+
+# USD pro Audio-Minute (OpenAI). Nur whisper-1 liefert verbose_json mit Segmenten.
+COST_PER_MINUTE = {
+    'whisper-1': 0.006,
+    'gpt-4o-transcribe': 0.006,
+    'gpt-4o-mini-transcribe': 0.003,
+}
+SEGMENT_MODELS = {'whisper-1'}
+
+# Standardmodell je Provider (whisper.cpp: GGML mit Q5_0-Quantisierung)
+DEFAULT_MODELS = {
+    'openai-whisper': 'whisper-1',
+    'faster-whisper': 'large-v3',
+    'whisper-cpp': 'large-v3-q5_0',
+}
+
+# Lange Aufnahmen: an Sprechpausen in ~5-Minuten-Teile schneiden und parallel
+# transkribieren (serverseitige Inferenz läuft dann N-fach gleichzeitig)
+SHARD_SECONDS = 300
+SILENCE_FILTER = 'silencedetect=n=-35dB:d=0.5'
+_SILENCE_END_RE = re.compile(rb'silence_end: ([\d.]+) \| silence_duration: ([\d.]+)')
+
+# Vor dem Upload nach Opus umkodieren (ab dieser Dateigrösse)
+TRANSCODE_MIN_BYTES = 5 << 20
+TRANSCODE_BITRATE = '24k'
+
+# Obergrenze gleichzeitiger blockierender Transkriptionen pro Prozess (z.B. im
+# Webserver mit vielen Meetings: nicht jeder Request-Thread lädt parallel hoch)
+TRANSCRIBE_WORKERS = int(os.getenv('WHISPER_WORKERS', '4'))
+
+# zstd-Stufe für compress_transcripts (3: schnell, trotzdem ~5× kleiner)
+ZSTD_LEVEL = 3
+
+# Wiederholungen bei 429/5xx/Timeouts, Wartezeit verdoppelt sich (1s → 2s → 4s)
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` requests per `period` seconds (thread-safe)"""
+    
+    def __init__(self, rate: int, period: float = 60.0):
+        self.capacity = rate
+        self.fill_rate = rate / period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _reserve(self) -> float:
+        """Take one token, return the seconds to wait before it may be used"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.fill_rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.fill_rate
+    
+    def acquire(self):
+        time.sleep(self._reserve())
+    
+    async def acquire_async(self):
+        await asyncio.sleep(self._reserve())
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def _http_client_options() -> Dict:
+    return dict(
+        # HTTP/2 nur mit installiertem h2 (httpx[http2])
+        http2=importlib.util.find_spec('h2') is not None,
+        limits=httpx.Limits(**HTTP_POOL_LIMITS),
+        timeout=httpx.Timeout(TRANSCRIPTION_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    )
+
+
+def _shared_http_client() -> 'httpx.Client':
+    """Process-wide httpx.Client (keep-alive pool), closed at exit"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(**_http_client_options())
+            atexit.register(_http_client.close)
+        return _http_client
+
+
+def _async_http_client() -> 'httpx.AsyncClient':
+    """New httpx.AsyncClient; the caller owns it (async with)"""
+    return httpx.AsyncClient(**_http_client_options())
+
+
+def _require(module, package: str, feature: str):
+    """Optional dependency or an ImportError that names the missing package"""
+    if module is None:
+        raise ImportError(f"{feature} braucht das Paket '{package}' (pip install {package})")
+    return module
+
+
+def _file_field(audio_path: str, audio_file) -> Tuple[str, object, str]:
+    """Multipart file tuple with an explicit content type"""
+    mime_type = mimetypes.guess_type(audio_path)[0] or 'application/octet-stream'
+    return Path(audio_path).name, audio_file, mime_type
+
+
+def _error_status(error: Exception) -> Optional[int]:
+    """HTTP status of an httpx or OpenAI SDK error, None for transport errors"""
+    return (getattr(error, 'status_code', None)
+            or getattr(getattr(error, 'response', None), 'status_code', None))
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors and connection problems are worth a retry"""
+    status = _error_status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    if httpx is not None and isinstance(error, httpx.TransportError):
+        return True
+    name = type(error).__name__
+    return 'Timeout' in name or 'Connection' in name or 'rate limit' in str(error).lower()
 
 class WhisperTranscriber:
     """Transcribe audio using OpenAI Whisper API or local whisper.cpp"""
     
+    # Gemeinsam für alle Instanzen; Threads entstehen erst beim ersten submit
+    _EXECUTOR = ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS, thread_name_prefix='whisper')
+    
     def __init__(self, config: Dict):
         self.config = config
         self.provider = config.get('provider', 'openai-whisper')
-        self.model = config.get('model', 'whisper-1')
+        self.model = config.get('model', DEFAULT_MODELS.get(self.provider, 'whisper-1'))
         self.language = config.get('language', 'de')
+        # Gleichzeitige Transkriptionen in transcribe_batch
+        self.max_concurrency = config.get('max_concurrency', 5)
+        # Bereits transkribierte Audios (gleicher Inhalt/Modell/Sprache) nicht neu bezahlen
+        self._cache = TranscriptCache.from_config(config)
+        # 'json' (lesbar) oder 'msgpack' (kleiner, schneller geladen) für transcript.*
+        self.transcript_format = config.get('transcript_format', 'json')
+        # False: nur Text ('json'), ~70% kleinere Antwort, keine Segmente
+        self.need_timestamps = config.get('need_timestamps', True)
+        # 'rows' (Liste von Dicts) oder 'columns' (start/end/text-Listen, kleiner)
+        self.segment_layout = config.get('segment_layout', 'rows')
+        # zstd spart ~80% Platz (braucht zstandard)
+        self.compress_transcripts = config.get('compress_transcripts', False)
+        # Fehlende optionale Pakete gleich melden, nicht erst nach der Transkription
+        if self.transcript_format == 'msgpack':
+            _require(ormsgpack, 'ormsgpack', "transcript_format 'msgpack'")
+        if self.compress_transcripts:
+            _require(zstandard, 'zstandard', 'compress_transcripts')
+        # 0 = nie aufteilen (braucht ffmpeg/ffprobe im PATH)
+        self.shard_seconds = config.get('shard_minutes', SHARD_SECONDS / 60) * 60
+        # Grosse Dateien vor dem Upload nach 16 kHz mono Opus umkodieren (ffmpeg)
+        self.transcode = config.get('transcode', True)
         
         if self.provider == 'openai-whisper':
-            self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+            # Erst hier importieren: openai (pydantic, anyio …) kostet ~300 ms,
+            # lokale Provider und estimate_cost brauchen es nicht
+            from openai import OpenAI
+            
+            self.client = OpenAI(
+                api_key=os.getenv('OPENAI_API_KEY'),
+                **({'http_client': _shared_http_client()} if httpx is not None else {})
+            )
+            # Form der Antwort steht pro Modell/Config fest: einmal auflösen, nicht pro Request
+            self._request_params = {
+                'model': self.model,
+                'language': self.language,
+                # verbose_json for timestamps; gpt-4o-*-transcribe only supports json
+                'response_format': ('verbose_json' if self.need_timestamps and self.model in SEGMENT_MODELS
+                                    else 'json')
+            }
+            self._has_segments = self._request_params['response_format'] == 'verbose_json'
+            self._transcriptions_url = f"{str(self.client.base_url).rstrip('/')}/audio/transcriptions"
+            self._auth_headers = {'Authorization': f'Bearer {self.client.api_key}'}
+            self._limiter = RateLimiter(config.get('rpm', 50))
+        elif self.provider == 'faster-whisper':
+            # 16 für ~16 GB VRAM, 8 für kleinere GPUs
+            self.batch_size = config.get('batch_size', 16)
+            self.device = config.get('device', 'auto')
+            # int8-Gewichte: ¼ der Speicherbandbreite von fp32 ('auto' → nach Gerät)
+            self.compute_type = config.get('compute_type', 'auto')
+            self._batched_model = None  # lazy: Modell erst beim ersten Aufruf laden
+        elif self.provider == 'whisper-cpp':
+            # Modellname (pywhispercpp lädt ihn herunter) oder Pfad zu einer ggml-*.bin
+            self.model_path = config.get('model_path') or self.model
+            self.n_threads = config.get('n_threads') or os.cpu_count()
+            # Weitere whisper.cpp-Parameter, z.B. {"flash_attn": true} (je nach Build)
+            self.whisper_cpp_params = config.get('whisper_cpp_params', {})
+            self._local_model = None
     
     def transcribe(self, audio_path: str) -> Dict:
         """
@@ -35,45 +249,273 @@ class WhisperTranscriber:
                 - language: Detected language
                 - duration: Audio duration in seconds
                 - segments: List of segments with timestamps (if available)
+                - cached: True if the result came from the transcript cache
         """
-        print(f"🎙️  Transkribiere: {audio_path}")
-        print(f"   Provider: {self.provider}")
+        self._print_start(audio_path)
+        
+        cache_key = self._cache_key(audio_path)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
         
+        result = self._transcribe_provider(audio_path)
+        self._cache_set(cache_key, result)
+        return result
+    
+    def transcribe_in_pool(self, audio_path: str) -> Future:
+        """transcribe() on the shared, bounded transcription executor"""
+        return self._EXECUTOR.submit(self.transcribe, audio_path)
+    
+    def _transcribe_provider(self, audio_path: str) -> Dict:
         if self.provider == 'openai-whisper':
             return self._transcribe_openai(audio_path)
+        elif self.provider == 'faster-whisper':
+            return _drain(self._iter_faster_whisper(audio_path))
         elif self.provider == 'whisper-cpp':
             return self._transcribe_local(audio_path)
         else:
             raise ValueError(f"Unknown provider: {self.provider}")
     
-    def _transcribe_openai(self, audio_path: str) -> Dict:
-        """Transcribe using OpenAI Whisper API"""
-        
-        with open(audio_path, "rb") as audio_file:
-            # Basic transcription
-            transcript = self.client.audio.transcriptions.create(
-                model=self.model,
-                file=audio_file,
-                language=self.language,
-                response_format="verbose_json"  # Get timestamps
-            )
+    def iter_segments(self, audio_path: str) -> Generator[Dict, None, Dict]:
+        """
+        Transcribe audio file segment by segment
+        
+        Yields segment dicts (start, end, text) as they become available and
+        returns the full transcript dict (same as transcribe()) at the end.
+        faster-whisper decodes lazily, the OpenAI API delivers all segments
+        in one response.
+        """
+        if self.provider == 'faster-whisper':
+            self._print_start(audio_path)
+            cache_key = self._cache_key(audio_path)
+            result = self._cache_get(cache_key)
+            if result is None:
+                result = yield from self._iter_faster_whisper(audio_path)
+                self._cache_set(cache_key, result)
+            else:
+                yield from result['segments']
+            return result
+        
+        result = self.transcribe(audio_path)
+        yield from result['segments']
+        return result
+    
+    def _print_start(self, audio_path: str):
+        print(f"🎙️  Transkribiere: {audio_path}")
+        print(f"   Provider: {self.provider}")
+    
+    def _cache_key(self, audio_path: str) -> Optional[str]:
+        if self._cache is None:
+            return None
+        return self._cache.key(audio_path, self._cache_model_id, self.language, self.need_timestamps)
+    
+    @property
+    def _cache_model_id(self) -> str:
+        """Model identity for the cache key (whisper.cpp: the loaded file)"""
+        if self.provider != 'whisper-cpp':
+            return self.model
+        model_path = Path(self.model_path).expanduser()
+        if model_path.is_file():
+            # Datei ersetzt (gleicher Pfad, anderes Modell) → neuer Schlüssel
+            stat = model_path.stat()
+            return f"{model_path.resolve()}@{stat.st_size}:{stat.st_mtime_ns}"
+        return self.model_path
+    
+    def _cache_get(self, cache_key: Optional[str]) -> Optional[Dict]:
+        if cache_key is None:
+            return None
+        result = self._cache.get(cache_key)
+        if result is not None:
+            print(f"♻️  Transkript aus Cache ({result['duration']:.1f}s, keine API-Kosten)")
+            result['cached'] = True
+        return result
+    
+    def _cache_set(self, cache_key: Optional[str], result: Dict):
+        if cache_key is not None:
+            self._cache.set(cache_key, result)
+    
+    def _iter_faster_whisper(self, audio_path: str) -> Generator[Dict, None, Dict]:
+        """Transcribe locally with faster-whisper's BatchedInferencePipeline"""
+        segments_iter, info = self._load_batched_model().transcribe(
+            audio_path,
+            language=self.language,
+            batch_size=self.batch_size
+        )
         
-        # Extract segments if available
         segments = []
-        if hasattr(transcript, 'segments') and transcript.segments:
-            segments = [
-                {
-                    'start': seg.get('start', 0),
-                    'end': seg.get('end', 0),
-                    'text': seg.get('text', '').strip()
-                }
-                for seg in transcript.segments
-            ]
+        for seg in segments_iter:
+            segment = {
+                'start': seg.start,
+                'end': seg.end,
+                'text': seg.text.strip()
+            }
+            segments.append(segment)
+            yield segment
+        
+        result = {
+            'text': ' '.join(seg['text'] for seg in segments),
+            'language': info.language or self.language,
+            'duration': info.duration,
+            'segments': segments,
+            'provider': 'faster-whisper',
+            'model': self.model
+        }
+        
+        print(f"✅ Transkription fertig ({result['duration']:.1f}s)")
+        print(f"   Länge: {len(result['text'])} Zeichen")
+        print(f"   Sprache: {result['language']}")
+        
+        return result
+    
+    def _load_batched_model(self):
+        if self._batched_model is None:
+            from faster_whisper import WhisperModel, BatchedInferencePipeline
+            
+            compute_type = self.compute_type
+            if compute_type == 'auto':
+                compute_type = _default_compute_type(self.device)
+            
+            print(f"   Lade Modell: {self.model} ({compute_type}, batch_size={self.batch_size})")
+            model = WhisperModel(self.model, device=self.device, compute_type=compute_type)
+            self._batched_model = BatchedInferencePipeline(model=model)
+        return self._batched_model
+    
+    def _transcribe_openai(self, audio_path: str) -> Dict:
+        """Transcribe using OpenAI Whisper API (long audio: shards in parallel)"""
+        
+        with tempfile.TemporaryDirectory(prefix='whisper-shards-') as workdir:
+            shards, duration = self._prepare_upload(audio_path, workdir)
+            if len(shards) == 1:
+                return self._openai_result(self._request_verbose_json(shards[0][1]), duration)
+            
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(shards))) as pool:
+                parts = list(pool.map(self._request_verbose_json, [p for _, p in shards]))
+        
+        return self._openai_result(_merge_shards(shards, parts), duration)
+    
+    async def _transcribe_openai_async(self, audio_path: str,
+                                       http_client: 'httpx.AsyncClient') -> Dict:
+        """Async variant of _transcribe_openai (shards via asyncio.gather)"""
+        with tempfile.TemporaryDirectory(prefix='whisper-shards-') as workdir:
+            shards, duration = await asyncio.to_thread(self._prepare_upload, audio_path, workdir)
+            if len(shards) == 1:
+                return self._openai_result(
+                    await self._request_verbose_json_async(shards[0][1], http_client), duration
+                )
+            
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            
+            async def request_one(shard_path: str) -> Dict:
+                async with semaphore:
+                    return await self._request_verbose_json_async(shard_path, http_client)
+            
+            parts = await asyncio.gather(*(request_one(p) for _, p in shards))
+        
+        return self._openai_result(_merge_shards(shards, parts), duration)
+    
+    def _prepare_upload(self, audio_path: str,
+                        workdir: str) -> Tuple[List[Tuple[float, str]], Optional[float]]:
+        """
+        Transcode (if worthwhile), then split: (offset, path) per upload
+        
+        Also returns the probed audio duration (None without ffprobe): the
+        json format of gpt-4o-*-transcribe reports tokens, not seconds.
+        """
+        duration = _probe_duration(audio_path) if shutil.which('ffprobe') else None
+        upload_path = self._transcode_audio(audio_path, workdir)
+        return self._split_audio(upload_path, workdir, duration), duration
+    
+    def _transcode_audio(self, audio_path: str, workdir: str) -> str:
+        """
+        Re-encode to 16 kHz mono Opus (what Whisper uses internally anyway)
+        
+        A 48 kHz stereo WAV/MP3 shrinks 5-10×, so the upload gets that much
+        shorter. Small files, transcode=false or missing ffmpeg: unchanged.
+        """
+        if (not self.transcode or not shutil.which('ffmpeg')
+                or os.path.getsize(audio_path) <= TRANSCODE_MIN_BYTES):
+            return audio_path
+        
+        ogg_path = str(Path(workdir) / 'upload.ogg')
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', '-y', '-i', audio_path, '-vn',
+             '-ac', '1', '-ar', '16000', '-c:a', 'libopus', '-b:a', TRANSCODE_BITRATE, ogg_path],
+            check=True, capture_output=True, timeout=TRANSCRIPTION_TIMEOUT
+        )
         
+        before, after = os.path.getsize(audio_path), os.path.getsize(ogg_path)
+        print(f"   🗜️  Opus 16 kHz mono: {before / 1e6:.1f} MB → {after / 1e6:.1f} MB")
+        return ogg_path if after < before else audio_path
+    
+    def _split_audio(self, audio_path: str, workdir: str,
+                     duration: Optional[float]) -> List[Tuple[float, str]]:
+        """
+        Cut long audio at silences into shards of about shard_seconds
+        
+        Returns (start offset in seconds, path) per shard, or the original
+        file alone when it is short, splitting is disabled or ffmpeg is missing.
+        """
+        whole = [(0.0, audio_path)]
+        if not self.shard_seconds or duration is None or not shutil.which('ffmpeg'):
+            return whole
+        
+        if duration <= 2 * self.shard_seconds:
+            return whole
+        
+        starts = [0.0]
+        for silence in _silence_midpoints(audio_path):
+            # Keine Pause gefunden: notfalls hart schneiden
+            while silence - starts[-1] > 2 * self.shard_seconds:
+                starts.append(starts[-1] + self.shard_seconds)
+            if silence - starts[-1] >= self.shard_seconds and duration - silence >= 1:
+                starts.append(silence)
+        while duration - starts[-1] > 2 * self.shard_seconds:
+            starts.append(starts[-1] + self.shard_seconds)
+        
+        suffix = Path(audio_path).suffix
+        shards = []
+        for i, (start, end) in enumerate(zip(starts, starts[1:] + [None])):
+            shard_path = str(Path(workdir) / f"shard-{i:03d}{suffix}")
+            cmd = ['ffmpeg', '-v', 'error', '-y', '-ss', f"{start:.3f}"]
+            if end is not None:
+                cmd += ['-t', f"{end - start:.3f}"]
+            cmd += ['-i', audio_path, '-c', 'copy', shard_path]
+            subprocess.run(cmd, check=True, capture_output=True, timeout=TRANSCRIPTION_TIMEOUT)
+            shards.append((start, shard_path))
+        
+        print(f"   ✂️  {len(shards)} Teile à ~{self.shard_seconds / 60:.0f} Min (an Sprechpausen)")
+        return shards
+    
+    def _openai_result(self, data: Dict, probed_duration: Optional[float] = None) -> Dict:
+        """
+        Build the transcript dict from a verbose_json/json response
+        probed_duration (ffprobe) is used when the response has no seconds
+        """
+        # Extract segments if available. verbose_json liefert start/end/text
+        # immer – einmal prüfen statt drei .get() pro Segment; json hat keine
+        raw_segments = (data.get('segments') or ()) if self._has_segments else ()
+        if raw_segments and not {'start', 'end', 'text'} <= raw_segments[0].keys():
+            raise ValueError(f"Unerwartetes Segment-Format: {sorted(raw_segments[0])}")
+        
+        segments = [None] * len(raw_segments)
+        for i, seg in enumerate(raw_segments):
+            text = seg['text']
+            segments[i] = {
+                'start': seg['start'],
+                'end': seg['end'],
+                'text': text.strip() if text else ''
+            }
+        
+        usage = data.get('usage') or {}
+        # json: whisper-1 meldet die Dauer nur in usage, gpt-4o-*-transcribe
+        # nur Tokens – dann zählt die per ffprobe gemessene Länge
+        duration = data.get('duration') or usage.get('seconds') or probed_duration
+        if not duration:
+            print("⚠️  Audio-Dauer unbekannt (ffprobe fehlt?) – Kosten werden mit 0 geschätzt")
         result = {
-            'text': transcript.text.strip(),
-            'language': transcript.language if hasattr(transcript, 'language') else self.language,
-            'duration': transcript.duration if hasattr(transcript, 'duration') else 0,
+            'text': data['text'].strip(),
+            'language': data.get('language') or self.language,
+            'duration': duration or 0,
             'segments': segments,
             'provider': 'openai-whisper',
             'model': self.model
@@ -85,31 +527,332 @@ class WhisperTranscriber:
         
         return result
     
+    async def transcribe_async(self, audio_path: str,
+                               http_client: Optional['httpx.AsyncClient'] = None) -> Dict:
+        """
+        Like transcribe(), but non-blocking: async HTTP for the OpenAI API,
+        the bounded transcription executor for local providers
+        
+        http_client: AsyncClient to reuse across calls (the caller closes
+                     it); without one, a client is opened and closed here
+        """
+        if self.provider != 'openai-whisper' or httpx is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._EXECUTOR, self.transcribe, audio_path
+            )
+        
+        self._print_start(audio_path)
+        # Hashen und Cache-Datei lesen blockieren → Worker-Thread
+        cache_key = await asyncio.to_thread(self._cache_key, audio_path)
+        cached = await asyncio.to_thread(self._cache_get, cache_key)
+        if cached is not None:
+            return cached
+        
+        if http_client is None:
+            async with _async_http_client() as http_client:
+                result = await self._transcribe_openai_async(audio_path, http_client)
+        else:
+            result = await self._transcribe_openai_async(audio_path, http_client)
+        await asyncio.to_thread(self._cache_set, cache_key, result)
+        return result
+    
+    async def transcribe_batch_async(self, audio_paths: List[str]) -> List[Dict]:
+        """
+        Transcribe several files concurrently (at most max_concurrency at
+        once), sharing one AsyncClient that is closed afterwards
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def transcribe_one(audio_path: str, http_client) -> Dict:
+            async with semaphore:
+                return await self.transcribe_async(audio_path, http_client)
+        
+        if self.provider != 'openai-whisper' or httpx is None:
+            return await asyncio.gather(*(transcribe_one(p, None) for p in audio_paths))
+        async with _async_http_client() as http_client:
+            return await asyncio.gather(*(transcribe_one(p, http_client) for p in audio_paths))
+    
+    def transcribe_batch(self, audio_paths: List[str]) -> List[Dict]:
+        """Blocking wrapper for transcribe_batch_async (results in input order)"""
+        return asyncio.run(self.transcribe_batch_async(audio_paths))
+    
+    def _request_verbose_json(self, audio_path: str) -> Dict:
+        """Rate-limited request with exponential backoff (see _post_verbose_json)"""
+        for attempt in range(MAX_RETRIES + 1):
+            self._limiter.acquire()
+            try:
+                return self._post_verbose_json(audio_path)
+            except Exception as e:
+                if attempt == MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = self._retry_delay(e, attempt)
+            time.sleep(delay)
+    
+    async def _request_verbose_json_async(self, audio_path: str,
+                                          http_client: 'httpx.AsyncClient') -> Dict:
+        """Async variant of _request_verbose_json"""
+        for attempt in range(MAX_RETRIES + 1):
+            await self._limiter.acquire_async()
+            try:
+                return await self._post_verbose_json_async(audio_path, http_client)
+            except Exception as e:
+                if attempt == MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = self._retry_delay(e, attempt)
+            await asyncio.sleep(delay)
+    
+    @staticmethod
+    def _retry_delay(error: Exception, attempt: int) -> float:
+        delay = RETRY_BASE_DELAY * 2 ** attempt
+        status = _error_status(error)
+        reason = f"HTTP {status}" if status else type(error).__name__
+        print(f"   ⚠️  Whisper API: {reason} – neuer Versuch in {delay:.0f}s")
+        return delay
+    
+    def _post_verbose_json(self, audio_path: str) -> Dict:
+        """
+        POST the audio to the transcriptions endpoint and parse the raw
+        verbose_json body with orjson (no SDK/pydantic models). Falls back
+        to the SDK client when httpx is not installed.
+        
+        httpx streams the multipart body from the open file, so memory stays
+        at one read buffer regardless of the audio size.
+        """
+        params = self._request_params
+        
+        if httpx is None:
+            with open(audio_path, "rb") as audio_file:
+                transcript = self.client.audio.transcriptions.create(file=audio_file, **params)
+            return transcript.model_dump()
+        
+        with open(audio_path, "rb", buffering=UPLOAD_BUFFER_SIZE) as audio_file:
+            response = _shared_http_client().post(
+                self._transcriptions_url,
+                headers=self._auth_headers,
+                files={'file': _file_field(audio_path, audio_file)},
+                data=params
+            )
+        response.raise_for_status()
+        return json_io.loads(response.content)
+    
+    async def _post_verbose_json_async(self, audio_path: str,
+                                       http_client: 'httpx.AsyncClient') -> Dict:
+        """
+        Async variant of _post_verbose_json. The shard (≤ the API's upload
+        limit) is read in a worker thread first: the AsyncClient would read
+        a sync file object on the event loop.
+        """
+        audio_bytes = await asyncio.to_thread(Path(audio_path).read_bytes)
+        response = await http_client.post(
+            self._transcriptions_url,
+            headers=self._auth_headers,
+            files={'file': _file_field(audio_path, audio_bytes)},
+            data=self._request_params
+        )
+        response.raise_for_status()
+        return json_io.loads(response.content)
+    
     def _transcribe_local(self, audio_path: str) -> Dict:
-        """Transcribe using local whisper.cpp"""
-        # TODO: Implement whisper.cpp integration
-        # For now, fallback to OpenAI API
-        print("⚠️  Lokales Whisper noch nicht implementiert, nutze OpenAI API")
-        return self._transcribe_openai(audio_path)
+        """Transcribe locally with whisper.cpp (pywhispercpp), no API cost"""
+        raw_segments = self._load_local_model().transcribe(audio_path, language=self.language)
+        
+        # whisper.cpp zählt t0/t1 in 10-ms-Schritten
+        segments = [None] * len(raw_segments)
+        for i, seg in enumerate(raw_segments):
+            segments[i] = {
+                'start': seg.t0 / 100,
+                'end': seg.t1 / 100,
+                'text': seg.text.strip()
+            }
+        
+        result = {
+            'text': ' '.join(seg['text'] for seg in segments),
+            'language': self.language,
+            'duration': segments[-1]['end'] if segments else 0,
+            'segments': segments,
+            'provider': 'whisper-cpp',
+            'model': self.model
+        }
+        
+        print(f"✅ Transkription fertig ({result['duration']:.1f}s)")
+        print(f"   Länge: {len(result['text'])} Zeichen")
+        print(f"   Sprache: {result['language']}")
+        
+        return result
+    
+    def _load_local_model(self):
+        if self._local_model is None:
+            from pywhispercpp.model import Model
+            
+            model_path = self.model_path
+            if os.sep in model_path or model_path.endswith('.bin'):
+                model_path = str(Path(model_path).expanduser())
+            
+            print(f"   Lade Modell: {model_path} ({self.n_threads} Threads)")
+            self._local_model = Model(
+                model_path,
+                n_threads=self.n_threads,
+                print_progress=False,
+                **self.whisper_cpp_params
+            )
+        return self._local_model
     
     def estimate_cost(self, audio_duration_seconds: float) -> float:
         """
         Estimate transcription cost
         
-        OpenAI Whisper: $0.006 per minute
+        OpenAI Whisper: $0.006 per minute (gpt-4o-mini-transcribe: $0.003)
         Local whisper: $0
+        Cached transcripts cost nothing: check transcript.get('cached') first
         """
         if self.provider == 'openai-whisper':
             minutes = audio_duration_seconds / 60
-            return minutes * 0.006
+            return minutes * COST_PER_MINUTE.get(self.model, 0.006)
         else:
             return 0.0
     
-    def save_transcript(self, transcript: Dict, output_path: str):
-        """Save transcript to JSON file"""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(transcript, f, indent=2, ensure_ascii=False)
+    def save_transcript(self, transcript: Dict, output_path: Union[str, Path],
+                        format: Optional[str] = None) -> str:
+        """
+        Save transcript as JSON (orjson bytes if installed, see utils.json_io)
+        or MessagePack (format='msgpack', file suffix becomes .msgpack)
+        
+        format defaults to the configured transcript_format.
+        With segment_layout 'columns' the segments are stored as parallel
+        start/end/text lists (no repeated keys, see load_transcript).
+        compress_transcripts adds zstd compression (suffix .zst).
+        Returns the path actually written.
+        """
+        format = format or self.transcript_format
+        output_path = str(output_path)
+        if self.segment_layout == 'columns':
+            transcript = {**transcript, 'segments': _segments_to_columns(transcript['segments'])}
+        
+        if format == 'msgpack':
+            output_path = str(Path(output_path).with_suffix('.msgpack'))
+            payload = _require(ormsgpack, 'ormsgpack', "format 'msgpack'").packb(transcript)
+        elif format == 'json':
+            # Spalten sind für Maschinen: ohne Einrückung (sonst eine Zeile pro Zahl)
+            payload = json_io.dumps(transcript, indent=self.segment_layout != 'columns')
+        else:
+            raise ValueError(f"Unknown transcript format: {format}")
+        
+        if self.compress_transcripts:
+            output_path += '.zst'
+            compressor = _require(zstandard, 'zstandard', 'compress_transcripts').ZstdCompressor
+            payload = compressor(level=ZSTD_LEVEL, threads=-1).compress(payload)
+        
+        json_io.write_bytes(payload, output_path)
         print(f"💾 Transkript gespeichert: {output_path}")
+        return output_path
+    
+    async def save_transcript_async(self, transcript: Dict, output_path: Union[str, Path],
+                                    format: Optional[str] = None) -> str:
+        """
+        save_transcript() in a worker thread: several writes (batch mode)
+        run concurrently and overlap with the next transcription
+        """
+        return await asyncio.to_thread(self.save_transcript, transcript, output_path, format)
+    
+    @staticmethod
+    def load_transcript(path: Union[str, Path]) -> Dict:
+        """
+        Load a transcript written by save_transcript (format by file suffix)
+        Column-stored segments come back as the usual list of dicts.
+        """
+        path = Path(path)
+        payload = path.read_bytes()
+        if path.suffix == '.zst':
+            decompressor = _require(zstandard, 'zstandard', path.name).ZstdDecompressor()
+            payload = decompressor.decompress(payload)
+            path = path.with_suffix('')
+        
+        if path.suffix == '.msgpack':
+            transcript = _require(ormsgpack, 'ormsgpack', path.name).unpackb(payload)
+        else:
+            transcript = json_io.loads(payload)
+        
+        if isinstance(transcript.get('segments'), dict):
+            transcript['segments'] = _segments_from_columns(transcript['segments'])
+        return transcript
+
+
+def _segments_to_columns(segments: List[Dict]) -> Dict[str, List]:
+    """[{start, end, text}, …] → {start: […], end: […], text: […]}"""
+    return {
+        'start': [seg['start'] for seg in segments],
+        'end': [seg['end'] for seg in segments],
+        'text': [seg['text'] for seg in segments],
+    }
+
+
+def _segments_from_columns(columns: Dict[str, List]) -> List[Dict]:
+    return [
+        {'start': start, 'end': end, 'text': text}
+        for start, end, text in zip(columns['start'], columns['end'], columns['text'])
+    ]
+
+
+def _probe_duration(audio_path: str) -> float:
+    """Audio duration in seconds via ffprobe"""
+    output = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+         '-of', 'default=noprint_wrappers=1:nokey=1', audio_path],
+        check=True, capture_output=True, timeout=TRANSCRIPTION_TIMEOUT
+    ).stdout
+    return float(output.strip() or 0)
+
+
+def _silence_midpoints(audio_path: str) -> List[float]:
+    """Middle of every pause found by ffmpeg's silencedetect filter (seconds)"""
+    output = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-nostats', '-i', audio_path,
+         '-af', SILENCE_FILTER, '-f', 'null', '-'],
+        check=True, capture_output=True, timeout=TRANSCRIPTION_TIMEOUT
+    ).stderr
+    return [float(end) - float(length) / 2 for end, length in _SILENCE_END_RE.findall(output)]
+
+
+def _merge_shards(shards: List[Tuple[float, str]], parts: List[Dict]) -> Dict:
+    """Stitch shard responses into one verbose_json dict (segment times shifted)"""
+    segments = []
+    texts = []
+    seconds = 0
+    for (offset, _), part in zip(shards, parts):
+        for seg in part.get('segments') or ():
+            segments.append({**seg, 'start': seg['start'] + offset, 'end': seg['end'] + offset})
+        text = part['text'].strip()
+        if text:
+            texts.append(text)
+        seconds += (part.get('usage') or {}).get('seconds') or 0
+    
+    # Ohne Sekundenangabe (Token-usage) bleibt die Dauer offen, siehe _openai_result
+    last_offset, last = shards[-1][0], parts[-1]
+    last_duration = last.get('duration') or (last.get('usage') or {}).get('seconds')
+    return {
+        'text': ' '.join(texts),
+        'language': parts[0].get('language'),
+        'duration': last_offset + last_duration if last_duration else None,
+        'segments': segments,
+        'usage': {'seconds': seconds} if seconds else {}
+    }
+
+
+def _drain(stream: Generator[Dict, None, Dict]) -> Dict:
+    """Run a segment generator to the end and return its result"""
+    while True:
+        try:
+            next(stream)
+        except StopIteration as done:
+            return done.value
+
+
+def _default_compute_type(device: str) -> str:
+    """int8 with fp16 activations on CUDA, plain int8 on CPU"""
+    if device == 'auto':
+        import ctranslate2
+        device = 'cuda' if ctranslate2.get_cuda_device_count() else 'cpu'
+    return 'int8_float16' if device == 'cuda' else 'int8'
 
 
 def test_transcription():
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+JSON helpers for pipeline artifacts
+Uses orjson (C, native UTF-8) when installed, stdlib json otherwise.
+"""
+
+import json
+from datetime import date, datetime, time
+from pathlib import PurePath, Path
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def to_builtin(obj: Any) -> Any:
+    """
+    Default handler for types JSON does not know: datetime/date/time
+    (ISO 8601), paths (str), sets (list) and numpy scalars/arrays (anything
+    with .tolist()). Composable: custom defaults can end with to_builtin(obj).
+    """
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, PurePath):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    tolist = getattr(obj, 'tolist', None)
+    if tolist is None:
+        raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+    return tolist()
+
+
+def dumps(obj: Any, indent: bool = True,
+          default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """
+    Serialize to UTF-8 JSON bytes (2-space indent like json.dump(indent=2))
+    default converts objects JSON does not know (same as json.dumps default);
+    numpy arrays and scalars (e.g. segment times after VAD) work without one
+    """
+    if orjson is not None:
+        # numpy-Arrays serialisiert orjson selbst in C, default nur für den Rest
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default or to_builtin, option=option)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False,
+                      default=default or to_builtin).encode('utf-8')
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Parse JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def write_bytes(payload: bytes, path: Union[str, Path]):
+    """Write an already serialized payload"""
+    Path(path).write_bytes(payload)
+
+
+def write_json(obj: Any, path: Union[str, Path],
+               default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Serialize and write obj, returns the written payload"""
+    payload = dumps(obj, default=default)
+    write_bytes(payload, path)
+    return payload
+
+
+def read_json(path: Union[str, Path]) -> Any:
+    """Read and parse a JSON file without decoding it to str first"""
+    return loads(Path(path).read_bytes())